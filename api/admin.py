@@ -12,3 +12,9 @@ admin.site.register(Product)
 admin.site.register(Order)
 admin.site.register(OrderProduct)
 admin.site.register(ProductIngredient)
+admin.site.register(StockMovement)
+admin.site.register(TableBooking)
+admin.site.register(ProductSalesDay)
+admin.site.register(EmployeeDay)
+admin.site.register(ReportJob)
+admin.site.register(CacheVersion)
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api import signals
+        from cursed import settings
+
+        if settings.REPORTS_WARMUP:
+            from api.pdf import warm_up
+
+            warm_up()
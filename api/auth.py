@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+
+from api.models import User
+from cursed import settings
+
+
+__all__ = ['PrincipalCache', 'principal_cache', 'TokenVersionCache', 'token_versions']
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple[int, str], tuple[float, User]] = OrderedDict()
+        self._tokens: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, token: str) -> User | None:
+        key = (user_id, token)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, user = entry
+
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return user
+
+    def put(self, user_id: int, token: str, user: User):
+        key = (user_id, token)
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(key)
+            self._tokens.setdefault(user_id, set()).add(token)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            for token in self._tokens.pop(user_id, set()):
+                self._entries.pop((user_id, token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _remove(self, key: tuple[int, str]):
+        user_id, token = key
+
+        self._entries.pop(key, None)
+
+        tokens = self._tokens.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens[user_id]
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_TTL, settings.PRINCIPAL_CACHE_SIZE)
+
+
+class TokenVersionCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+        self._versions: dict[int, tuple[float, int | None]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> int | None:
+        with self._lock:
+            entry = self._versions.get(user_id)
+
+        if entry is not None and entry[0] >= time.monotonic():
+            return entry[1]
+
+        version = User.objects.filter(id=user_id).values_list('token_version', flat=True).first()
+        self.set(user_id, version)
+
+        return version
+
+    def set(self, user_id: int, version: int | None):
+        with self._lock:
+            self._versions[user_id] = (time.monotonic() + self.ttl, version)
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+
+
+token_versions = TokenVersionCache(settings.TOKEN_VERSION_CACHE_TTL)
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from api.models import TableBooking
+from cursed import settings
+
+
+__all__ = ['AvailabilityIndex', 'availability']
+
+
+class AvailabilityIndex:
+    def __init__(self, ttl: float, max_days: int):
+        self.ttl = ttl
+        self.max_days = max_days
+
+        self._days: OrderedDict[date, tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def booked(self, day: date) -> int:
+        return self.booked_range([day])[day]
+
+    def is_booked(self, day: date, table_id: int) -> bool:
+        return bool(self.booked(day) >> table_id & 1)
+
+    def booked_range(self, days: list[date]) -> dict[date, int]:
+        now = time.monotonic()
+        result = {}
+
+        with self._lock:
+            for day in days:
+                entry = self._days.get(day)
+
+                if entry is not None and entry[0] >= now:
+                    self._days.move_to_end(day)
+                    result[day] = entry[1]
+
+        missing = [day for day in days if day not in result]
+
+        if missing:
+            loaded = dict.fromkeys(missing, 0)
+
+            for day, table_id in TableBooking.objects.filter(
+                date__range=(min(missing), max(missing))
+            ).values_list('date', 'table_id'):
+                if day in loaded:
+                    loaded[day] |= 1 << table_id
+
+            with self._lock:
+                for day, bitmap in loaded.items():
+                    self._store(day, bitmap, now)
+
+            result.update(loaded)
+
+        return result
+
+    def mark(self, day: date, table_id: int):
+        with self._lock:
+            if day in self._days:
+                expires_at, bitmap = self._days[day]
+                self._days[day] = (expires_at, bitmap | 1 << table_id)
+
+    def unmark(self, day: date, table_id: int):
+        with self._lock:
+            if day in self._days:
+                expires_at, bitmap = self._days[day]
+                self._days[day] = (expires_at, bitmap & ~(1 << table_id))
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+
+    def _store(self, day: date, bitmap: int, now: float):
+        self._days[day] = (now + self.ttl, bitmap)
+        self._days.move_to_end(day)
+
+        while len(self._days) > self.max_days:
+            self._days.popitem(last=False)
+
+
+availability = AvailabilityIndex(settings.AVAILABILITY_CACHE_TTL, settings.AVAILABILITY_CACHE_DAYS)
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from typing import Any
+
+
+__all__ = ['Broadcaster', 'Subscription', 'get_broadcaster', 'set_broadcaster']
+
+
+class Subscription:
+    def __init__(self, max_pending: int):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def push(self, event: Any):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass
+
+    async def get(self) -> Any:
+        return await self.queue.get()
+
+    def drain(self):
+        self.overflowed = False
+
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def _put(self, event: Any):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broadcaster:
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_pending)
+
+        with self._lock:
+            self._subscriptions.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event: Any):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            subscription.push(event)
+
+
+_kitchen = Broadcaster()
+
+
+def get_broadcaster() -> Broadcaster:
+    return _kitchen
+
+
+def set_broadcaster(broadcaster: Broadcaster):
+    global _kitchen
+    _kitchen = broadcaster
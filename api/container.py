@@ -0,0 +1,76 @@
+import inspect
+import threading
+from typing import Any, Callable
+
+from django.utils.module_loading import import_string
+
+
+__all__ = ['ServiceContainer', 'services', 'SINGLETON', 'REQUEST']
+
+
+SINGLETON = 'singleton'
+REQUEST = 'request'
+
+
+class ServiceContainer:
+    def __init__(self):
+        self._providers: dict[str, tuple[str, str]] = {}
+        self._singletons: dict[str, Any] = {}
+        self._dependencies: dict[Callable, tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: str, scope: str = SINGLETON):
+        if scope not in (SINGLETON, REQUEST):
+            raise ValueError(f'Unknown service scope: {scope}')
+
+        with self._lock:
+            self._providers[name] = (path, scope)
+            self._singletons.pop(name, None)
+
+    def dependencies(self, endpoint: Callable) -> tuple[str, ...]:
+        names = self._dependencies.get(endpoint)
+
+        if names is None:
+            names = tuple(name for name in inspect.signature(endpoint).parameters if name in self._providers)
+            self._dependencies[endpoint] = names
+
+        return names
+
+    def resolve(self, name: str, scope: dict[str, Any] = None) -> Any:
+        path, lifetime = self._providers[name]
+
+        if lifetime == REQUEST:
+            if scope is None:
+                return import_string(path)()
+
+            if name not in scope:
+                scope[name] = import_string(path)()
+
+            return scope[name]
+
+        service = self._singletons.get(name)
+
+        if service is None:
+            with self._lock:
+                service = self._singletons.get(name)
+
+                if service is None:
+                    service = self._singletons[name] = import_string(path)()
+
+        return service
+
+    def reset(self):
+        with self._lock:
+            self._singletons.clear()
+            self._dependencies.clear()
+
+
+services = ServiceContainer()
+
+services.register('user_service', 'api.services.user_service.UserService')
+services.register('promo_service', 'api.services.promo_service.PromoService')
+services.register('product_service', 'api.services.product_service.ProductService')
+services.register('order_service', 'api.services.order_service.OrderService')
+services.register('employee_service', 'api.services.employee_service.EmployeeService')
+services.register('report_service', 'api.services.report_service.ReportService')
+services.register('report_job_service', 'api.services.report_job_service.ReportJobService')
@@ -1,11 +1,17 @@
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import date, datetime
 from decimal import Decimal
+from itertools import islice
+from typing import Iterable, Iterator
 
-from api.models import User, Promo, Order, OrderProduct, Product, Role, Ingredient, Table, ProductIngredient
+from api.models import User, Promo, Order, OrderProduct, Product, Role, Ingredient, Table, ReportJob
 
 
-@dataclass
+ORDERS_BATCH_SIZE = 500
+
+
+@dataclass(slots=True)
 class RoleDTO:
     id: int
     name: str
@@ -15,7 +21,7 @@ class RoleDTO:
         return RoleDTO(role.id, role.name)
 
 
-@dataclass
+@dataclass(slots=True)
 class UserDTO:
     id: int
     first_name: str
@@ -29,14 +35,14 @@ class UserDTO:
         return UserDTO(user.id, user.first_name, user.last_name, user.phone_number, user.role.id, user.role.name)
 
 
-@dataclass
+@dataclass(slots=True)
 class EmployeeDTO:
     employee: UserDTO
     shifts: list[date]
     tables: list[int]
 
 
-@dataclass
+@dataclass(slots=True)
 class PromoDTO:
     id: int
     text: str
@@ -47,14 +53,14 @@ class PromoDTO:
         return PromoDTO(promo.id, promo.text, promo.content.url)
 
 
-@dataclass
+@dataclass(slots=True)
 class BookingDTO:
     id: int
     table: int
     date: date
 
 
-@dataclass
+@dataclass(slots=True)
 class IngredientDTO:
     id: int
     name: str
@@ -65,7 +71,7 @@ class IngredientDTO:
         return IngredientDTO(ingredient.id, ingredient.name, ingredient.count)
 
 
-@dataclass
+@dataclass(slots=True)
 class ProductDTO:
     id: int
     name: str
@@ -76,7 +82,7 @@ class ProductDTO:
         return ProductDTO(product.id, product.name, product.price)
 
 
-@dataclass
+@dataclass(slots=True)
 class ProductWithIngredientsDTO:
     id: int
     name: str
@@ -95,12 +101,20 @@ class ProductWithIngredientsDTO:
                     ingredient.ingredient.name,
                     ingredient.count
                 )
-                for ingredient in ProductIngredient.objects.filter(product_id=product.id).all()
+                for ingredient in product.productingredient_set.all()
             ]
         )
 
 
-@dataclass
+@dataclass(slots=True)
+class MenuItemDTO:
+    id: int
+    name: str
+    price: Decimal
+    servings: int | None
+
+
+@dataclass(slots=True)
 class OrderProductDTO:
     id: int
     name: str
@@ -108,7 +122,7 @@ class OrderProductDTO:
     count: int
 
 
-@dataclass
+@dataclass(slots=True)
 class OrderDTO:
     id: int
     date: datetime
@@ -119,24 +133,36 @@ class OrderDTO:
 
     @staticmethod
     def from_model(order: Order) -> 'OrderDTO':
-        return OrderDTO(
-            order.id,
-            order.date,
-            order.address,
-            order.table.id if order.table else None,
-            order.status,
-            [
-                OrderProductDTO(
-                    order_product.product.id,
-                    order_product.product.name,
-                    order_product.product.price,
-                    order_product.count
-                ) for order_product in OrderProduct.objects.filter(order_id=order.id).all()
-            ]
-        )
+        return OrderDTO.from_models([order])[0]
+
+    @staticmethod
+    def from_models(orders: Iterable[Order]) -> list['OrderDTO']:
+        return list(OrderDTO.iter_models(orders))
+
+    @staticmethod
+    def iter_models(orders: Iterable[Order]) -> Iterator['OrderDTO']:
+        orders = iter(orders)
+
+        while batch := list(islice(orders, ORDERS_BATCH_SIZE)):
+            positions = defaultdict(list)
+
+            for order_id, product_id, name, price, count in OrderProduct.objects.filter(
+                order_id__in=[order.id for order in batch]
+            ).order_by('id').values_list('order_id', 'product_id', 'product__name', 'product__price', 'count'):
+                positions[order_id].append(OrderProductDTO(product_id, name, price, count))
+
+            for order in batch:
+                yield OrderDTO(
+                    order.id,
+                    order.date,
+                    order.address,
+                    order.table_id,
+                    order.status,
+                    positions[order.id]
+                )
 
 
-@dataclass
+@dataclass(slots=True)
 class TableDTO:
     id: int
     waiter_id: int | None
@@ -149,3 +175,35 @@ class TableDTO:
             table.client_id if table.client else None,
             table.waiter_id if table.waiter else None
         )
+
+
+@dataclass(slots=True)
+class EmployeeDayDTO:
+    date: date
+    orders: int
+    revenue: Decimal
+
+
+@dataclass(slots=True)
+class EmployeeReportDTO:
+    first_name: str
+    last_name: str
+    role: str
+    orders: int
+    revenue: Decimal
+    shifts: int
+    days: list[EmployeeDayDTO]
+
+
+@dataclass(slots=True)
+class ReportJobDTO:
+    id: int
+    kind: str
+    from_date: date
+    to_date: date
+    status: str
+    error: str
+
+    @staticmethod
+    def from_model(job: ReportJob) -> 'ReportJobDTO':
+        return ReportJobDTO(job.id, job.kind, job.from_date, job.to_date, job.status, job.error)
@@ -4,4 +4,5 @@ from .promo import *
 from .table import *
 from .order import *
 from .product import *
-from .report import *
\ No newline at end of file
+from .report import *
+from .stats import *
\ No newline at end of file
@@ -4,6 +4,7 @@ from django.core.exceptions import BadRequest
 from django.http import HttpResponse
 
 from api.dto import EmployeeDTO, UserDTO, RoleDTO
+from api.invalidation import EMPLOYEES, ROLES, SHIFTS, TABLES
 from api.models import Role, Table, User
 from api.services.employee_service import EmployeeService
 from api.services.user_service import UserService
@@ -50,23 +51,18 @@ def new_employee(request, user_service: UserService = None, **kwargs):
 
 @get
 @jwt_secured
-@provide_services
 @for_roles('Админ', 'Работник зала')
+@conditional(EMPLOYEES, ROLES, SHIFTS, TABLES)
+@provide_services
 def get_employees(request, employee_service: EmployeeService = None, **kwargs):
-    employees = employee_service.get_all_employees()
-    employees = [e for e in employees if e.role is None or e.role.name != 'Клиент']
-
-    result = []
-    for employee in employees:
-        result.append(
-            EmployeeDTO(
-                UserDTO.from_model(employee),
-                [shift.date for shift in employee.shifts.all()],
-                [table.id for table in Table.objects.filter(waiter_id=employee.id)]
-            )
+    return stream_json(request, (
+        EmployeeDTO(
+            UserDTO.from_model(employee),
+            [shift.date for shift in employee.shifts.all()],
+            [table.id for table in employee.assigns.all()]
         )
-
-    return HttpResponse(jsonify(result), content_type='application/json')
+        for employee in employee_service.get_all_employees()
+    ))
 
 
 @get
@@ -88,8 +84,9 @@ def get_employee_shifts(request, user: User, employee_service: EmployeeService =
 
 @get
 @jwt_secured
-@provide_services
 @for_roles('Админ')
+@conditional(ROLES)
+@provide_services
 def get_employees_roles(request, employee_service: EmployeeService = None, **kwargs):
     return HttpResponse(jsonify([RoleDTO.from_model(r) for r in employee_service.get_employees_roles()]), content_type='application/json')
 
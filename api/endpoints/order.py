@@ -1,17 +1,26 @@
+import asyncio
 import json
+import time
 
+from asgiref.sync import sync_to_async
 from django.core.exceptions import BadRequest
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
 from api.dto import EmployeeDTO, UserDTO, BookingDTO, OrderDTO
+from api.broadcast import get_broadcaster
 from api.models import Role, Table, User, Order, Product
 from api.services.employee_service import EmployeeService
-from api.services.order_service import OrderService
+from api.services.order_service import OrderService, StockShortageError
 from api.services.user_service import UserService
 from api.utils import *
 
 
+ORDERS_PAGE_SIZE = 50
+ORDERS_MAX_PAGE_SIZE = 200
+KITCHEN_HEARTBEAT = 15
+
+
 @get
 @jwt_secured
 @for_roles('Клиент')
@@ -66,22 +75,32 @@ def cancel_booking(request, user: User = None, order_service: OrderService = Non
 @for_roles('Клиент', 'Официант', 'Курьер')
 @provide_services
 def get_user_orders(request, user: User = None, order_service: OrderService = None, **kwargs):
-    officiant_tables = [t.id for t in Table.objects.filter(waiter_id=user.id).all()]
-    return HttpResponse(
-        jsonify(
-            list(
-                map(
-                    lambda order: OrderDTO.from_model(order),
-                    filter(
-                        lambda o: o.client.id == user.id or o.table_id in officiant_tables or o.courier_id == user.id,
-                        order_service.get_orders(None, [] if user.role.name not in ('Официант',) else officiant_tables)
-                    )
-                )
-            )
-        ),
+    try:
+        limit = min(int(request.GET.get('limit', ORDERS_PAGE_SIZE)), ORDERS_MAX_PAGE_SIZE)
+    except ValueError:
+        raise BadRequest('Некорректный размер страницы')
+
+    if limit <= 0:
+        raise BadRequest('Некорректный размер страницы')
+
+    after = request.GET.get('after', None)
+
+    try:
+        orders = order_service.get_user_orders(user, limit + 1, order_service.decode_cursor(after) if after else None)
+    except ValueError as e:
+        raise BadRequest(f'{e}')
+
+    response = HttpResponse(
+        jsonify(OrderDTO.from_models(orders[:limit])),
         content_type='application/json'
     )
 
+    response['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+    if len(orders) > limit:
+        response['X-Next-Cursor'] = order_service.encode_cursor(orders[limit - 1])
+
+    return response
+
 
 @post
 @jwt_secured
@@ -109,15 +128,29 @@ def create_order(request, user: User = None, order_service: OrderService = None,
     if address_data and table_data or not address_data and not table_data:
         raise BadRequest('Заказ может быть только в зале или на доставку')
 
+    if not products:
+        raise BadRequest('Необходимо выбрать хотя бы одну позицию')
+
     table = None
 
     if table_data:
         table = Table.objects.get(id=table_data)
 
-    products_list = Product.objects.filter(id__in=list(map(lambda x: x['id'], products)))
-    counts_list = list(map(lambda x: x['count'], products))
+    products_by_id = Product.objects.in_bulk([p['id'] for p in products])
+
+    if any(p['id'] not in products_by_id for p in products):
+        raise BadRequest('Такой позиции нет в меню')
 
-    order_service.create_order(user, table, address_data, list(zip(products_list, counts_list)))
+    try:
+        order_service.create_order(user, table, address_data, [(products_by_id[p['id']], p['count']) for p in products])
+    except StockShortageError as e:
+        return HttpResponse(
+            jsonify({'error': f'{e}', 'shortages': e.shortages}),
+            status=400,
+            content_type='application/json'
+        )
+    except ValueError as e:
+        raise BadRequest(f'{e}')
 
     return HttpResponse()
 
@@ -127,14 +160,7 @@ def create_order(request, user: User = None, order_service: OrderService = None,
 @for_roles('Админ')
 @provide_services
 def get_delivery_orders(request, order_service: OrderService = None, **kwargs):
-    return HttpResponse(
-        jsonify(
-            [
-                OrderDTO.from_model(o)
-                for o in order_service.get_delivery_orders()
-            ]
-        )
-    )
+    return stream_json(request, OrderDTO.iter_models(order_service.get_delivery_orders()))
 
 
 @get
@@ -142,14 +168,15 @@ def get_delivery_orders(request, order_service: OrderService = None, **kwargs):
 @for_roles('Админ')
 @provide_services
 def get_unfinished_delivery_orders(request, order_service: OrderService = None, **kwargs):
-    return HttpResponse(
-        jsonify(
-            [
-                OrderDTO.from_model(o)
-                for o in order_service.get_unfinished_delivery_orders()
-            ]
-        )
-    )
+    return stream_json(request, OrderDTO.iter_models(order_service.get_unfinished_delivery_orders()))
+
+
+@get
+@jwt_secured
+@for_roles('Админ')
+@provide_services
+def export_orders(request, order_service: OrderService = None, **kwargs):
+    return stream_json(request, OrderDTO.iter_models(order_service.get_order_history()))
 
 
 @post
@@ -178,18 +205,49 @@ def appoint_courier_to_order(request, employee_service: EmployeeService = None,
 @for_roles('Работник кухни')
 @provide_services
 def get_active_orders(request, order_service: OrderService = None, **kwargs):
-    return HttpResponse(
-        jsonify(
-            [
-                OrderDTO.from_model(o)
-                for o in order_service.get_orders(
-                    'Принят',
-                    []
-                ) +
-                order_service.get_orders(
-                    'Готовится',
-                    []
-                )
-            ]
-        )
+    return stream_json(request, OrderDTO.iter_models(order_service.get_active_orders()))
+
+
+@get
+@jwt_secured
+@for_roles('Работник кухни')
+@provide_services
+def stream_active_orders(request, order_service: OrderService = None, **kwargs):
+    if not is_asgi(request):
+        return HttpResponse('Поток заказов доступен только при запуске через ASGI', status=501)
+
+    async def events():
+        broadcaster = get_broadcaster()
+        subscription = broadcaster.subscribe()
+
+        try:
+            while True:
+                subscription.drain()
+                stamp, snapshot = await sync_to_async(
+                    lambda: (order_service.get_active_orders_stamp(), OrderDTO.from_models(order_service.get_active_orders()))
+                )()
+                checked_at = time.monotonic()
+
+                yield f'event: snapshot\ndata: {jsonify(snapshot)}\n\n'
+
+                while not subscription.overflowed:
+                    try:
+                        order = await asyncio.wait_for(subscription.get(), timeout=KITCHEN_HEARTBEAT)
+                    except asyncio.TimeoutError:
+                        yield ': keep-alive\n\n'
+                    else:
+                        yield f'event: order\ndata: {jsonify(order)}\n\n'
+
+                    if time.monotonic() - checked_at >= KITCHEN_HEARTBEAT:
+                        if await sync_to_async(order_service.get_active_orders_stamp)() != stamp:
+                            break
+
+                        checked_at = time.monotonic()
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingHttpResponse(
+        events(),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
     )
@@ -5,27 +5,21 @@ from django.core.exceptions import BadRequest
 from django.http import HttpResponse
 
 from api.dto import EmployeeDTO, UserDTO, ProductDTO, IngredientDTO, ProductWithIngredientsDTO
+from api.invalidation import INGREDIENTS
 from api.models import Role, Table, Ingredient
 from api.services.employee_service import EmployeeService
 from api.services.order_service import OrderService
 from api.services.product_service import ProductService
 from api.services.user_service import UserService
+from api.snapshot import snapshot_response
 from api.utils import *
 
 
 @get
 @jwt_secured
 @for_roles('Клиент', 'Официант')
-@provide_services
-def get_menu(request, product_service: ProductService, **kwargs):
-    return HttpResponse(
-        jsonify(
-            [
-                ProductDTO.from_model(p)
-                for p in product_service.get_all_products()
-            ]
-        )
-    )
+def get_menu(request, **kwargs):
+    return snapshot_response(request, 'menu', 'get_menu')
 
 
 @get
@@ -36,8 +30,8 @@ def get_analyze(request, order_service: OrderService, **kwargs):
     from_date_data = request.GET.get('fromdate', None)
     to_date_data = request.GET.get('todate', None)
 
-    from_date = timify(from_date_data)
-    to_date = timify(to_date_data)
+    from_date = timify(from_date_data).date()
+    to_date = timify(to_date_data).date()
 
     return HttpResponse(
         jsonify(
@@ -46,7 +40,7 @@ def get_analyze(request, order_service: OrderService, **kwargs):
                     'product': ProductDTO.from_model(product),
                     'count': count
                 }
-                for product, count in order_service.analyze_sales(from_date, to_date)
+                for product, count in order_service.analyze_sales(from_date, to_date).items()
             ]
         )
     )
@@ -55,16 +49,10 @@ def get_analyze(request, order_service: OrderService, **kwargs):
 @get
 @jwt_secured
 @for_roles('Админ')
+@conditional(INGREDIENTS, key=lambda request, product_service: product_service.get_stock_stamp())
 @provide_services
 def get_all_ingredients(request, product_service: ProductService = None, **kwargs):
-    return HttpResponse(
-        jsonify(
-            [
-                IngredientDTO.from_model(i)
-                for i in product_service.get_all_ingredients()
-            ]
-        )
-    )
+    return stream_json(request, (IngredientDTO.from_model(i) for i in product_service.get_all_ingredients()))
 
 
 @post
@@ -82,19 +70,33 @@ def replenish_ingredients(request, product_service: ProductService = None, **kwa
     return HttpResponse()
 
 
+@post
+@jwt_secured
+@for_roles('Админ')
+@provide_services
+def adjust_ingredient(request, ingredient_id: int, product_service: ProductService = None, **kwargs):
+    delta = json.loads(request.body).get('delta', None)
+
+    if not isinstance(delta, int) or isinstance(delta, bool) or not delta:
+        raise BadRequest('Изменение остатка должно быть ненулевым целым числом')
+
+    try:
+        product_service.adjust_ingredient(ingredient_id, delta)
+    except ValueError as e:
+        raise BadRequest(f'{e}')
+
+    return HttpResponse()
+
+
 @get
 @jwt_secured
 @for_roles('Админ')
 @provide_services
 def get_products(request, product_service: ProductService = None, **kwargs):
-    return HttpResponse(
-        jsonify(
-            [
-                ProductWithIngredientsDTO.from_model(product)
-                for product in product_service.get_all_products()
-            ]
-        )
-    )
+    return stream_json(request, (
+        ProductWithIngredientsDTO.from_model(product)
+        for product in product_service.get_all_products(with_ingredients=True)
+    ))
 
 
 @post
@@ -1,19 +1,52 @@
 import json
 
 from django.core.exceptions import BadRequest
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse, Http404, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
 
-from api.models import User
+from api.dto import ReportJobDTO
+from api.models import User, ReportJob
+from api.services.report_job_service import ReportJobService
 from api.services.report_service import ReportService
 from api.utils import *
 
 
+USER_REPORT_MAX_DAYS = 366
+
+
+def cached_report_response(request, report_service: ReportService, kind: str, from_date, to_date, filename: str):
+    key = report_service.get_report_key(kind, from_date, to_date)
+    etag = quote_etag(key)
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        _, report = report_service.get_cached_report(kind, from_date, to_date, key)
+        response = streaming(
+            request, FileResponse(report, as_attachment=True, filename=filename, content_type='application/pdf')
+        )
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Access-Control-Expose-Headers'] = 'ETag'
+
+    return response
+
+
 @get
 @jwt_secured
 @for_roles('Официант', 'Курьер')
 @provide_services
 def get_user_report(request, user: User = None, report_service: ReportService = None, **kwargs):
-    report = report_service.generate_user_report(user)
+    try:
+        days = int(request.GET.get('days', 7))
+    except ValueError:
+        raise BadRequest('Некорректное количество дней')
+
+    if not 1 <= days <= USER_REPORT_MAX_DAYS:
+        raise BadRequest(f'Количество дней должно быть от 1 до {USER_REPORT_MAX_DAYS}')
+
+    report = report_service.generate_user_report(user, days)
 
     return HttpResponse(jsonify(report), content_type='application/json')
 
@@ -32,12 +65,14 @@ def get_product_sales_report(request, report_service: ReportService, **kwargs):
     from_date = timify(from_date_data)
     to_date = timify(to_date_data)
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Sales from {from_date.day}.{from_date.month}.{from_date.year} to {to_date.day}.{to_date.month}.{to_date.year}.pdf"'
-
-    report_service.generate_product_sales_report(from_date, to_date, response)
-
-    return response
+    return cached_report_response(
+        request,
+        report_service,
+        ReportJob.PRODUCT_SALES,
+        from_date,
+        to_date,
+        f'Sales from {from_date.day}.{from_date.month}.{from_date.year} to {to_date.day}.{to_date.month}.{to_date.year}.pdf'
+    )
 
 
 @get
@@ -54,9 +89,66 @@ def get_employees_report(request, report_service: ReportService = None, **kwargs
     from_date = timify(from_date_data)
     to_date = timify(to_date_data)
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Employee Report from {from_date.day}.{from_date.month}.{from_date.year} to {to_date.day}.{to_date.month}.{to_date.year}.pdf"'
+    return cached_report_response(
+        request,
+        report_service,
+        ReportJob.EMPLOYEES,
+        from_date,
+        to_date,
+        f'Employee Report from {from_date.day}.{from_date.month}.{from_date.year} to {to_date.day}.{to_date.month}.{to_date.year}.pdf'
+    )
 
-    report_service.generate_employees_report(from_date, to_date, response)
 
-    return response
+@post
+@jwt_secured
+@provide_services
+@for_roles('Админ')
+def new_report_job(request, report_job_service: ReportJobService = None, **kwargs):
+    data = json.loads(request.body)
+
+    kind = data.get('kind', None)
+    from_date_data = data.get('from_date', None)
+    to_date_data = data.get('to_date', None)
+
+    if kind not in (ReportJob.PRODUCT_SALES, ReportJob.EMPLOYEES):
+        raise BadRequest('Неизвестный тип отчёта')
+
+    if not from_date_data or not to_date_data:
+        raise BadRequest('Необходимо указать даты начала и окончания периода')
+
+    job = report_job_service.submit(kind, timify(from_date_data).date(), timify(to_date_data).date())
+
+    return HttpResponse(jsonify(ReportJobDTO.from_model(job)), content_type='application/json')
+
+
+@get
+@jwt_secured
+@provide_services
+@for_roles('Админ')
+def get_report_job(request, job_id: int, report_job_service: ReportJobService = None, **kwargs):
+    job = report_job_service.get(job_id)
+
+    if job is None:
+        raise Http404
+
+    return HttpResponse(jsonify(ReportJobDTO.from_model(job)), content_type='application/json')
+
+
+@get
+@jwt_secured
+@provide_services
+@for_roles('Админ')
+def download_report_job(request, job_id: int, report_job_service: ReportJobService = None, **kwargs):
+    job = report_job_service.get(job_id)
+
+    if job is None or job.status != ReportJob.DONE or not job.file:
+        raise Http404
+
+    title = 'Sales' if job.kind == ReportJob.PRODUCT_SALES else 'Employee Report'
+
+    return streaming(request, FileResponse(
+        job.file.open('rb'),
+        as_attachment=True,
+        filename=f'{title} from {job.from_date.day}.{job.from_date.month}.{job.from_date.year} to {job.to_date.day}.{job.to_date.month}.{job.to_date.year}.pdf',
+        content_type='application/pdf'
+    ))
@@ -0,0 +1,28 @@
+from django.http import HttpResponse
+
+from api.utils import *
+
+
+@get
+@jwt_secured
+@for_roles('Админ')
+def get_conditional_stats(request, **kwargs):
+    return HttpResponse(
+        jsonify(
+            {
+                'scope': 'process',
+                'pid': conditional_stats.pid,
+                'since': conditional_stats.started_at,
+                'endpoints': [
+                    {
+                        'endpoint': endpoint,
+                        'requests': requests,
+                        'not_modified': not_modified,
+                        'ratio': round(not_modified / requests, 3)
+                    }
+                    for endpoint, (requests, not_modified) in sorted(conditional_stats.snapshot().items())
+                ]
+            }
+        ),
+        content_type='application/json'
+    )
@@ -5,6 +5,7 @@ from django.core.exceptions import BadRequest
 from django.http import HttpResponse
 
 from api.dto import TableDTO
+from api.invalidation import TABLES
 from api.services.employee_service import EmployeeService
 from api.services.order_service import OrderService
 from api.services.user_service import UserService
@@ -23,16 +24,42 @@ def get_available_tables_by_date(request, order_service: OrderService = None, **
     return HttpResponse(jsonify([t.id for t in order_service.get_available_tables(time)]), content_type='application/json')
 
 
+@get
+@jwt_secured
+@for_roles('Клиент', 'Официант', 'Работник зала', 'Админ')
+@provide_services
+def get_tables_availability(request, order_service: OrderService = None, **kwargs):
+    from_date_data = request.GET.get('from_date')
+    to_date_data = request.GET.get('to_date')
+
+    if not from_date_data or not to_date_data:
+        raise BadRequest('Необходимо указать даты начала и окончания периода')
+
+    try:
+        tables, days, available = order_service.get_availability_matrix(
+            timify(from_date_data).date(),
+            timify(to_date_data).date()
+        )
+    except ValueError as e:
+        raise BadRequest(f'{e}')
+
+    return HttpResponse(
+        jsonify({'tables': tables, 'days': days, 'available': available}),
+        content_type='application/json'
+    )
+
+
 @get
 @jwt_secured
 @for_roles('Работник зала')
+@conditional(TABLES, key=lambda request, order_service: order_service.get_tables_stamp(date.today()))
 @provide_services
 def get_tables(request, order_service: OrderService = None, **kwargs):
-    tables = order_service.get_available_tables(date.today())
+    tables = order_service.get_available_tables(date.today(), include_seated=True)
     tables_amount = len(tables)
-    occupied_tables_amount = len(filter(lambda x: x.client is not None, tables))
+    occupied_tables_amount = len([table for table in tables if table.client is not None])
 
-    load = occupied_tables_amount / tables_amount
+    load = occupied_tables_amount / tables_amount if tables_amount else 0
 
     return HttpResponse(
         jsonify(
@@ -43,5 +70,6 @@ def get_tables(request, order_service: OrderService = None, **kwargs):
                 ],
                 'load': load
             }
-        )
+        ),
+        content_type='application/json'
     )
\ No newline at end of file
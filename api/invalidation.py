@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable
+
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import CacheVersion
+from cursed import settings
+
+
+__all__ = [
+    'InvalidationBus', 'invalidation',
+    'PRODUCTS', 'INGREDIENTS', 'TABLES', 'SHIFTS', 'PROMOS', 'USERS', 'EMPLOYEES', 'ROLES'
+]
+
+
+PRODUCTS = 'products'
+INGREDIENTS = 'ingredients'
+TABLES = 'tables'
+SHIFTS = 'shifts'
+PROMOS = 'promos'
+USERS = 'users'
+EMPLOYEES = 'employees'
+ROLES = 'roles'
+
+
+class InvalidationBus:
+    def __init__(self, interval: float):
+        self.interval = interval
+
+        self._versions: dict[str, tuple[int, datetime]] | None = None
+        self._listeners: dict[str, list[Callable[[], None]]] = defaultdict(list)
+        self._local_listeners: dict[str, list[Callable[[], None]]] = defaultdict(list)
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def subscribe(self, namespace: str, listener: Callable[[], None], local: bool = False):
+        (self._local_listeners if local else self._listeners)[namespace].append(listener)
+
+    def version(self, namespace: str) -> int:
+        return self.stamp(namespace)[0]
+
+    def stamp(self, namespace: str) -> tuple[int, datetime | None]:
+        self.poll()
+
+        return self._versions.get(namespace, (0, None))
+
+    def bump(self, *namespaces: str):
+        transaction.on_commit(lambda: self._bump(namespaces))
+
+    def poll(self, force: bool = False):
+        now = time.monotonic()
+
+        if not force and self._versions is not None and now - self._checked_at < self.interval:
+            return
+
+        with self._lock:
+            if not force and self._versions is not None and now - self._checked_at < self.interval:
+                return
+
+            self._checked_at = now
+            versions = {
+                namespace: (version, updated_at)
+                for namespace, version, updated_at in CacheVersion.objects.values_list('namespace', 'version', 'updated_at')
+            }
+
+            if self._versions is None:
+                self._versions = versions
+                return
+
+            changed = [
+                namespace for namespace, (version, _) in versions.items()
+                if self._versions.get(namespace, (None, None))[0] != version
+            ]
+            self._versions = versions
+
+        for namespace in changed:
+            self._notify(namespace)
+
+    def _bump(self, namespaces: tuple[str, ...]):
+        for namespace in namespaces:
+            stamp = self._increment(namespace)
+
+            with self._lock:
+                if self._versions is not None:
+                    self._versions[namespace] = stamp
+
+            self._notify(namespace)
+
+            for listener in self._local_listeners[namespace]:
+                listener()
+
+    def _increment(self, namespace: str) -> tuple[int, datetime]:
+        versions = CacheVersion.objects.filter(namespace=namespace)
+
+        if not versions.update(version=F('version') + 1, updated_at=timezone.now()):
+            try:
+                with transaction.atomic():
+                    CacheVersion.objects.create(namespace=namespace, version=1)
+            except IntegrityError:
+                versions.update(version=F('version') + 1, updated_at=timezone.now())
+
+        return versions.values_list('version', 'updated_at').get()
+
+    def _notify(self, namespace: str):
+        for listener in self._listeners[namespace]:
+            listener()
+
+
+invalidation = InvalidationBus(settings.INVALIDATION_INTERVAL)
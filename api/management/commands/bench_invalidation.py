@@ -0,0 +1,77 @@
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.invalidation import invalidation
+
+
+NAMESPACE = 'bench_invalidation'
+
+
+class Command(BaseCommand):
+    help = 'Bumps a cache version and measures how long other worker processes take to notice it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--watch', type=int, default=None, help='Internal: watch for a version above this one')
+
+    def handle(self, *args, workers: int, timeout: float, watch: int | None, **options):
+        if watch is not None:
+            return self._watch(watch, timeout)
+
+        invalidation.poll(force=True)
+        version = invalidation.version(NAMESPACE)
+
+        watchers = [
+            subprocess.Popen(
+                [sys.executable, sys.argv[0], 'bench_invalidation', '--watch', str(version), '--timeout', str(timeout)],
+                stdout=subprocess.PIPE,
+                text=True
+            )
+            for _ in range(workers)
+        ]
+
+        try:
+            for watcher in watchers:
+                if watcher.stdout.readline().strip() != 'ready':
+                    raise CommandError('Процесс-наблюдатель не запустился')
+
+            bumped_at = time.time()
+            invalidation.bump(NAMESPACE)
+
+            delays = []
+            for watcher in watchers:
+                line = watcher.stdout.readline().strip()
+
+                if not line:
+                    raise CommandError(f'Изменение не замечено за {timeout} с')
+
+                delays.append(float(line) - bumped_at)
+        finally:
+            for watcher in watchers:
+                watcher.wait()
+
+        self.stdout.write(
+            f'{workers} workers, poll interval {invalidation.interval:.2f}s: '
+            f'max delay {max(delays) * 1000:.0f} ms, mean {sum(delays) / len(delays) * 1000:.0f} ms'
+        )
+
+    def _watch(self, version: int, timeout: float):
+        changed = []
+        invalidation.subscribe(NAMESPACE, lambda: changed.append(time.time()))
+        invalidation.poll(force=True)
+
+        self.stdout.write('ready')
+        self.stdout.flush()
+
+        deadline = time.monotonic() + timeout
+
+        while not changed and time.monotonic() < deadline:
+            invalidation.poll()
+            time.sleep(0.01)
+
+        if changed:
+            self.stdout.write(f'{changed[0]}')
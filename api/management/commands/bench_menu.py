@@ -0,0 +1,57 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.menu import ServingsMatrix, vectorized
+
+
+class Command(BaseCommand):
+    help = 'Measures building and incrementally updating the servings matrix of the cookable menu'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--ingredients', type=int, default=3000)
+        parser.add_argument('--recipe-size', type=int, default=8)
+        parser.add_argument('--changed', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, products: int, ingredients: int, recipe_size: int, changed: int, repeat: int, **options):
+        generator = random.Random(0)
+
+        product_ids = list(range(1, products + 1))
+        recipes = [
+            (product_id, ingredient_id, generator.randint(1, 5))
+            for product_id in product_ids
+            for ingredient_id in generator.sample(range(1, ingredients + 1), recipe_size)
+        ]
+        stock = {ingredient_id: generator.randint(0, 500) for ingredient_id in range(1, ingredients + 1)}
+
+        updated = dict(stock)
+        for ingredient_id in generator.sample(range(1, ingredients + 1), changed):
+            updated[ingredient_id] = generator.randint(0, 500)
+
+        backends = [('pure python', None)]
+        if vectorized() is not None:
+            backends.append(('numpy', vectorized()))
+
+        self.stdout.write(f'{products} products, {ingredients} ingredients, {len(recipes)} recipe entries')
+
+        results = []
+        for name, np in backends:
+            build = min(timeit.repeat(lambda: ServingsMatrix(product_ids, recipes, stock, np), number=1, repeat=repeat))
+
+            matrices = [ServingsMatrix(product_ids, recipes, stock, np) for _ in range(repeat)]
+            update = min(timeit.repeat(lambda: matrices.pop().update(updated), number=1, repeat=repeat))
+
+            matrix = ServingsMatrix(product_ids, recipes, stock, np)
+            affected = matrix.update(updated)
+            results.append(matrix.get_servings())
+
+            self.stdout.write(
+                f'  {name}: build {build * 1000:.1f} ms, update of {changed} ingredients '
+                f'({affected} products) {update * 1000:.2f} ms'
+            )
+
+        if any(servings != results[0] for servings in results):
+            raise CommandError('Результаты расчёта различаются')
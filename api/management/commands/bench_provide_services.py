@@ -0,0 +1,62 @@
+import timeit
+from functools import wraps
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from api.services.employee_service import EmployeeService
+from api.services.order_service import OrderService
+from api.services.product_service import ProductService
+from api.services.promo_service import PromoService
+from api.services.report_job_service import ReportJobService
+from api.services.report_service import ReportService
+from api.services.user_service import UserService
+from api.utils import provide_services
+
+
+def provide_all_services(endpoint):
+    @wraps(endpoint)
+    def provide(request, *args, **kwargs):
+        return endpoint(
+            request,
+            *args,
+            **kwargs,
+            user_service=UserService(),
+            promo_service=PromoService(),
+            product_service=ProductService(),
+            order_service=OrderService(),
+            employee_service=EmployeeService(),
+            report_service=ReportService(),
+            report_job_service=ReportJobService()
+        )
+
+    return provide
+
+
+def no_services(request, **kwargs):
+    return None
+
+
+def one_service(request, order_service: OrderService = None, **kwargs):
+    return order_service
+
+
+def three_services(request, user_service: UserService = None, order_service: OrderService = None, employee_service: EmployeeService = None, **kwargs):
+    return order_service
+
+
+class Command(BaseCommand):
+    help = 'Measures the per-call overhead of constructing every service versus resolving declared ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=100000)
+
+    def handle(self, *args, calls: int, **options):
+        request = RequestFactory().get('/')
+
+        for endpoint in (no_services, one_service, three_services):
+            for name, decorator in (('all services', provide_all_services), ('declared only', provide_services)):
+                decorated = decorator(endpoint)
+                elapsed = timeit.timeit(lambda: decorated(request), number=calls)
+
+                self.stdout.write(f'{endpoint.__name__}, {name}: {elapsed / calls * 1e6:.2f} us per call')
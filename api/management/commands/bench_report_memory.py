@@ -0,0 +1,79 @@
+import resource
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import User, Role, Shift, EmployeeDay
+from api.services.report_service import ReportService
+
+
+class Command(BaseCommand):
+    help = 'Measures peak RSS of the employees report for a short and a long period on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=20)
+        parser.add_argument('--days', type=int, nargs='+', default=[31, 3 * 365])
+
+    def handle(self, *args, employees: int, days: list[int], **options):
+        if len(days) > 1:
+            for period in days:
+                subprocess.run(
+                    [sys.executable, sys.argv[0], 'bench_report_memory', '--employees', str(employees), '--days', str(period)],
+                    check=True
+                )
+
+            return
+
+        to_date = date(2000, 12, 31)
+        from_date = to_date - timedelta(days=days[0] - 1)
+
+        with transaction.atomic():
+            self._populate(employees, from_date, days[0])
+
+            baseline = self._rss()
+            started = time.perf_counter()
+
+            with ReportService().generate_employees_report(from_date, to_date) as report:
+                size = report.seek(0, 2)
+
+            elapsed = time.perf_counter() - started
+            peak = self._rss()
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'{days[0]} days x {employees} employees: {size / 1024:.0f} KiB in {elapsed:.2f}s, '
+            f'peak RSS {peak:.1f} MiB (+{peak - baseline:.1f} MiB while rendering)'
+        )
+
+    def _populate(self, employees: int, from_date: date, days: int):
+        role = Role.objects.get(name='Официант')
+
+        users = User.objects.bulk_create(
+            [
+                User(username=f'bench_report_memory_{i}', first_name=f'Сотрудник {i}', last_name='Тестовый', role=role)
+                for i in range(employees)
+            ]
+        )
+        shifts = Shift.objects.bulk_create([Shift(date=from_date + timedelta(day)) for day in range(days)])
+
+        for user in users:
+            User.shifts.through.objects.bulk_create(
+                [User.shifts.through(user_id=user.id, shift_id=shift.id) for shift in shifts],
+                batch_size=1000
+            )
+            EmployeeDay.objects.bulk_create(
+                [
+                    EmployeeDay(employee=user, date=shift.date, orders=day % 17, revenue=Decimal(day % 17) * 450)
+                    for day, shift in enumerate(shifts)
+                ],
+                batch_size=1000
+            )
+
+    def _rss(self) -> float:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,73 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import User, Role, Shift, EmployeeDay
+from api.pdf import can_render_in_parallel
+from api.services.report_service import ReportService
+
+
+class Command(BaseCommand):
+    help = 'Compares employees report rendering time for several worker process counts on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=200)
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+
+    def handle(self, *args, employees: int, days: int, workers: list[int], **options):
+        if not can_render_in_parallel(2):
+            raise CommandError('Для параллельного формирования отчётов необходим пакет pypdf')
+
+        to_date = date(2000, 12, 31)
+        from_date = to_date - timedelta(days=days - 1)
+
+        with transaction.atomic():
+            self._populate(employees, from_date, days)
+
+            serial = None
+
+            for processes in workers:
+                if processes > 1:
+                    ReportService().generate_employees_report(to_date, to_date, processes=processes).close()
+
+                started = time.perf_counter()
+
+                with ReportService().generate_employees_report(from_date, to_date, processes=processes) as report:
+                    size = report.seek(0, 2)
+
+                elapsed = time.perf_counter() - started
+                serial = serial or elapsed
+
+                self.stdout.write(
+                    f'{processes} worker(s): {elapsed:.2f}s, {size / 1024:.0f} KiB, speedup x{serial / elapsed:.2f}'
+                )
+
+            transaction.set_rollback(True)
+
+    def _populate(self, employees: int, from_date: date, days: int):
+        role = Role.objects.get(name='Официант')
+
+        users = User.objects.bulk_create(
+            [
+                User(username=f'bench_report_processes_{i}', first_name=f'Сотрудник {i}', last_name='Тестовый', role=role)
+                for i in range(employees)
+            ]
+        )
+        shifts = Shift.objects.bulk_create([Shift(date=from_date + timedelta(day)) for day in range(days)])
+
+        User.shifts.through.objects.bulk_create(
+            [User.shifts.through(user_id=user.id, shift_id=shift.id) for user in users for shift in shifts],
+            batch_size=1000
+        )
+        EmployeeDay.objects.bulk_create(
+            [
+                EmployeeDay(employee=user, date=shift.date, orders=day % 17, revenue=Decimal(day % 17) * 450)
+                for user in users
+                for day, shift in enumerate(shifts)
+            ],
+            batch_size=1000
+        )
@@ -0,0 +1,76 @@
+import dataclasses
+import json
+import timeit
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.dto import (
+    OrderDTO, OrderProductDTO, EmployeeDTO, UserDTO, ProductWithIngredientsDTO, IngredientDTO, BookingDTO, TableDTO,
+    EmployeeReportDTO, EmployeeDayDTO
+)
+from api.utils import jsonify
+
+
+class LegacyJSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        if dataclasses.is_dataclass(o):
+            return dataclasses.asdict(o)
+        if isinstance(o, datetime):
+            o = o + timedelta(hours=4)
+            return f'{o.day:02d}.{o.month:02d}.{o.year} {o.hour:02d}:{o.minute:02d}'
+        if isinstance(o, date):
+            return f'{o.day:02d}.{o.month:02d}.{o.year}'
+        if isinstance(o, Decimal):
+            return float(o)
+
+        return super().default(o)
+
+
+class Command(BaseCommand):
+    help = 'Compares the legacy asdict-based JSON encoder with the compiled DTO serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, orders: int, repeat: int, **options):
+        now = timezone.now()
+
+        payload = [
+            OrderDTO(
+                i,
+                now - timedelta(minutes=i),
+                None if i % 3 else f'ул. Тестовая, {i}',
+                i % 20 or None,
+                'Принят',
+                [OrderProductDTO(j, f'Позиция {j}', Decimal('149.90') + j, j + 1) for j in range(3)]
+            )
+            for i in range(orders)
+        ]
+
+        for sample in (payload, self._samples(now)):
+            if jsonify(sample) != json.dumps(sample, cls=LegacyJSONEncoder):
+                raise CommandError('Вывод сериализаторов отличается от прежнего')
+
+        legacy = min(timeit.repeat(lambda: json.dumps(payload, cls=LegacyJSONEncoder), number=1, repeat=repeat))
+        compiled = min(timeit.repeat(lambda: jsonify(payload), number=1, repeat=repeat))
+
+        self.stdout.write(f'{orders} orders, {len(jsonify(payload)) / 1024:.0f} KiB, identical output')
+        self.stdout.write(f'  asdict encoder: {legacy * 1000:.0f} ms')
+        self.stdout.write(f'  compiled:       {compiled * 1000:.0f} ms (x{legacy / compiled:.1f})')
+
+    def _samples(self, now: datetime) -> list:
+        user = UserDTO(1, 'Иван', 'Иванов', '+79990000000', 2, 'Официант')
+
+        return [
+            EmployeeDTO(user, [date(2024, 1, 2), date(2024, 1, 3)], [1, 2]),
+            ProductWithIngredientsDTO(1, 'Пирог', Decimal('5.50'), [IngredientDTO(1, 'Мука', 3)]),
+            BookingDTO(1, 2, now),
+            TableDTO(1, None, 3),
+            EmployeeReportDTO('Иван', 'Иванов', 'Официант', 1, Decimal('5'), 1, [EmployeeDayDTO(date(2024, 1, 2), 0, 0)]),
+            {'orders': [1, 2], 'total': Decimal('1.10'), 'day': date(2024, 1, 2), 'users': [user]},
+            [{'date': '16.10', 'orders': 0, 'total': 0}],
+        ]
@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.models import Ingredient, Product, ProductIngredient, Role, User, Order
+from api.services.order_service import OrderService
+from cursed import settings
+
+
+class Command(BaseCommand):
+    help = 'Compares order throughput on shared ingredients with update-in-place stock and the stock ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=500)
+
+    def handle(self, *args, threads: int, orders: int, **options):
+        client = User.objects.create_user(
+            username='bench_stock_writes', password=None, role=Role.objects.get_or_create(name='Клиент')[0]
+        )
+        ingredient = Ingredient.objects.create(name='bench_stock_writes', count=0)
+        product = Product.objects.create(name='bench_stock_writes', price=1)
+        ProductIngredient.objects.create(product=product, ingredient=ingredient, count=1)
+
+        try:
+            for name, ledger in (('update-in-place', False), ('ledger', True)):
+                Ingredient.objects.filter(id=ingredient.id).update(count=orders)
+
+                with mock.patch.object(settings, 'STOCK_LEDGER', ledger):
+                    elapsed = self._run(lambda: OrderService().create_order(client, None, 'bench', [(product, 1)]), threads, orders)
+
+                self.stdout.write(f'{name}: {orders} orders in {elapsed:.2f}s ({orders / elapsed:.0f} orders/s)')
+        finally:
+            Order.objects.filter(client=client).delete()
+            product.delete()
+            ingredient.delete()
+            client.delete()
+
+    def _run(self, order, threads: int, orders: int) -> float:
+        def worker(count: int):
+            try:
+                for _ in range(count):
+                    order()
+            finally:
+                connection.close()
+
+        share, rest = divmod(orders, threads)
+
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, [share + (1 if i < rest else 0) for i in range(threads)]))
+
+        return time.perf_counter() - started
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.services.product_service import ProductService
+
+
+class Command(BaseCommand):
+    help = 'Folds pending stock movements into the ingredient balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, batch_size: int, **options):
+        compacted = ProductService().compact_stock_ledger(batch_size)
+
+        self.stdout.write(f'Compacted {compacted} stock movements')
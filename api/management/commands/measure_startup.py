@@ -0,0 +1,70 @@
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cursed import settings
+
+
+WORKER_STARTUP = 'import cursed.wsgi; from django.urls import get_resolver; get_resolver().url_patterns'
+
+
+class Command(BaseCommand):
+    help = 'Measures import time of a fresh worker process and fails when it exceeds the budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=settings.STARTUP_BUDGET_MS)
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=10)
+
+    def handle(self, *args, budget_ms: float, runs: int, top: int, **options):
+        best = None
+
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', WORKER_STARTUP],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+
+            if result.returncode:
+                raise CommandError(result.stderr)
+
+            imports = self._parse(result.stderr)
+
+            if best is None or elapsed < best[0]:
+                best = (elapsed, imports)
+
+        elapsed, imports = best
+
+        packages = defaultdict(int)
+        for module, own in imports.items():
+            packages[module.split('.')[0]] += own
+
+        self.stdout.write(f'Worker startup: {elapsed:.0f} ms wall, {sum(imports.values()) / 1000:.0f} ms importing (budget {budget_ms:.0f} ms)')
+
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {package}: {own / 1000:.1f} ms')
+
+        if 'reportlab' in packages:
+            self.stdout.write(self.style.WARNING('reportlab is imported on startup'))
+
+        if elapsed > budget_ms:
+            raise CommandError(f'Worker startup takes {elapsed:.0f} ms, budget is {budget_ms:.0f} ms')
+
+    def _parse(self, output: str) -> dict[str, int]:
+        imports = {}
+
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+
+            own, _, module = line.removeprefix('import time:').split('|')
+            imports[module.strip()] = int(own)
+
+        return imports
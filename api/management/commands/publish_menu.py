@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.snapshot import menu_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Publishes the menu and promos snapshot served by the menu and promos endpoints'
+
+    def handle(self, *args, **options):
+        for feed, path in menu_snapshot.publish().items():
+            self.stdout.write(f'{feed}: {path} ({path.stat().st_size} bytes)')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.services.rollup_service import RollupService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily sales and employee rollups from the order history'
+
+    def handle(self, *args, **options):
+        RollupService().rebuild()
+
+        self.stdout.write('Rollups rebuilt')
@@ -0,0 +1,200 @@
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any
+
+from api.dto import MenuItemDTO
+from api.invalidation import invalidation, PRODUCTS, INGREDIENTS
+from api.models import Product, ProductIngredient, Ingredient
+from cursed import settings
+
+
+__all__ = ['ServingsMatrix', 'CookableMenu', 'cookable_menu', 'vectorized']
+
+
+@lru_cache
+def vectorized() -> Any:
+    if not settings.MENU_VECTORIZE:
+        return None
+
+    import numpy
+
+    return numpy
+
+
+class ServingsMatrix:
+    def __init__(self, products: list[int], recipes: list[tuple[int, int, int]], stock: dict[int, int], np: Any = None):
+        self.np = np
+
+        rows = {product_id: row for row, product_id in enumerate(products)}
+        recipes = sorted(
+            (rows[product_id], ingredient_id, count) for product_id, ingredient_id, count in recipes
+            if product_id in rows and count > 0
+        )
+
+        self.ingredients = sorted({ingredient_id for _, ingredient_id, _ in recipes})
+        self.columns = {ingredient_id: column for column, ingredient_id in enumerate(self.ingredients)}
+
+        self.rows = [row for row, _, _ in recipes]
+        self.cols = [self.columns[ingredient_id] for _, ingredient_id, _ in recipes]
+        self.counts = [count for _, _, count in recipes]
+
+        self.starts = [None] * len(products)
+        self.ends = [None] * len(products)
+        for entry, row in enumerate(self.rows):
+            if self.starts[row] is None:
+                self.starts[row] = entry
+            self.ends[row] = entry + 1
+
+        self.stock = self._stock(stock)
+
+        if np is not None:
+            self.rows = np.array(self.rows, dtype=np.int64)
+            self.cols = np.array(self.cols, dtype=np.int64)
+            self.counts = np.array(self.counts, dtype=np.int64)
+            self.stock = np.array(self.stock, dtype=np.int64)
+
+            self.cooked = np.array([start is not None for start in self.starts], dtype=bool)
+            self.segments = np.array([start for start in self.starts if start is not None], dtype=np.int64)
+
+            self.per_entry = self.stock[self.cols] // self.counts
+            self.servings = np.zeros(len(products), dtype=np.int64)
+            self._reduce()
+        else:
+            self.entries = defaultdict(list)
+            for entry, column in enumerate(self.cols):
+                self.entries[column].append(entry)
+
+            self.per_entry = [self.stock[column] // count for column, count in zip(self.cols, self.counts)]
+            self.servings = [0] * len(products)
+            for row in range(len(products)):
+                self._reduce_row(row)
+
+    def update(self, stock: dict[int, int]) -> int:
+        np = self.np
+        current = self._stock(stock)
+
+        if np is not None:
+            current = np.array(current, dtype=np.int64)
+            changed = np.flatnonzero(current != self.stock)
+
+            if not len(changed):
+                return 0
+
+            self.stock = current
+            affected = np.isin(self.cols, changed)
+            self.per_entry[affected] = self.stock[self.cols[affected]] // self.counts[affected]
+            self._reduce()
+
+            return len(np.unique(self.rows[affected]))
+
+        affected = set()
+
+        for column, count in enumerate(current):
+            if count == self.stock[column]:
+                continue
+
+            self.stock[column] = count
+            for entry in self.entries[column]:
+                self.per_entry[entry] = count // self.counts[entry]
+                affected.add(self.rows[entry])
+
+        for row in affected:
+            self._reduce_row(row)
+
+        return len(affected)
+
+    def get_servings(self) -> list[int | None]:
+        if self.np is not None:
+            return [servings if cooked else None for servings, cooked in zip(self.servings.tolist(), self.cooked.tolist())]
+
+        return [servings if start is not None else None for servings, start in zip(self.servings, self.starts)]
+
+    def _stock(self, stock: dict[int, int]) -> list[int]:
+        return [max(stock.get(ingredient_id, 0), 0) for ingredient_id in self.ingredients]
+
+    def _reduce(self):
+        if len(self.segments):
+            self.servings[self.cooked] = self.np.minimum.reduceat(self.per_entry, self.segments)
+
+    def _reduce_row(self, row: int):
+        if self.starts[row] is not None:
+            self.servings[row] = min(self.per_entry[self.starts[row]:self.ends[row]])
+
+
+class CookableMenu:
+    def __init__(self):
+        self._products: list[tuple[int, str, Any]] = []
+        self._matrix: ServingsMatrix | None = None
+        self._items: list[MenuItemDTO] = []
+        self._versions: tuple[int, int] | None = None
+        self._loaded_at = 0.0
+        self._stock_stamp: str | None = None
+        self._lock = threading.Lock()
+
+    def items(self) -> list[MenuItemDTO]:
+        versions = (invalidation.version(PRODUCTS), invalidation.version(INGREDIENTS))
+
+        if versions != self._versions or self._expired():
+            with self._lock:
+                if versions != self._versions:
+                    self._refresh(versions)
+                elif self._expired():
+                    self._refresh_stock()
+
+        return self._items
+
+    def clear(self):
+        with self._lock:
+            self._versions = None
+            self._matrix = None
+
+    def _refresh(self, versions: tuple[int, int]):
+        if self._matrix is None or self._versions[0] != versions[0]:
+            self._products = list(Product.objects.order_by('id').values_list('id', 'name', 'price'))
+            self._matrix = ServingsMatrix(
+                [product_id for product_id, _, _ in self._products],
+                list(ProductIngredient.objects.values_list('product_id', 'ingredient_id', 'count')),
+                self._load_stock(),
+                vectorized()
+            )
+        elif not self._matrix.update(self._load_stock()):
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+            return
+
+        self._items = [
+            MenuItemDTO(product_id, name, price, servings)
+            for (product_id, name, price), servings in zip(self._products, self._matrix.get_servings())
+            if servings != 0
+        ]
+        self._versions = versions
+        self._loaded_at = time.monotonic()
+
+    def _refresh_stock(self):
+        from api.services.product_service import ProductService
+
+        stamp = ProductService().get_stock_stamp()
+
+        if stamp == self._stock_stamp:
+            self._loaded_at = time.monotonic()
+            return
+
+        self._refresh(self._versions)
+
+    def _expired(self) -> bool:
+        return time.monotonic() - self._loaded_at >= settings.MENU_STOCK_TTL
+
+    def _load_stock(self) -> dict[int, int]:
+        from api.services.product_service import ProductService, with_balance
+
+        self._stock_stamp = ProductService().get_stock_stamp()
+
+        if settings.STOCK_LEDGER:
+            return dict(with_balance(Ingredient.objects.all()).values_list('id', 'balance'))
+
+        return dict(Ingredient.objects.values_list('id', 'count'))
+
+
+cookable_menu = CookableMenu()
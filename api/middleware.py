@@ -0,0 +1,10 @@
+from api.invalidation import invalidation
+
+
+def invalidation_middleware(get_response):
+    def middleware(request):
+        invalidation.poll()
+
+        return get_response(request)
+
+    return middleware
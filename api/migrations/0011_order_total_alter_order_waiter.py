@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:57
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_order_waiter_alter_order_address_alter_order_courier_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=11),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='waiter',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='served_orders', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_user_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('order', 'Расход на заказ'), ('replenishment', 'Пополнение'), ('adjustment', 'Корректировка')], max_length=20)),
+                ('delta', models.IntegerField()),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('compacted', models.BooleanField(default=False)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='api.ingredient')),
+                ('order', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='api.order')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('compacted', False)), fields=['ingredient'], name='stock_movement_pending')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:59
+
+from django.db import migrations, models
+
+
+def fill_order_kinds(apps, schema_editor):
+    Order = apps.get_model('api', 'Order')
+    OrderProduct = apps.get_model('api', 'OrderProduct')
+
+    ordered = OrderProduct.objects.values('order_id')
+
+    Order.objects.exclude(id__in=ordered).update(kind='booking')
+    Order.objects.filter(id__in=ordered).exclude(address=None).exclude(address='').update(kind='delivery')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_stockmovement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='kind',
+            field=models.CharField(choices=[('booking', 'Бронь'), ('dine_in', 'В зале'), ('delivery', 'Доставка')], default='dine_in', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['kind', 'date'], name='api_order_kind_e5bc5b_idx'),
+        ),
+        migrations.RunPython(fill_order_kinds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_order_kind'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['client', '-date', '-id'], name='api_order_client__7034e7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['courier', '-date', '-id'], name='api_order_courier_3b4e52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['table', '-date', '-id'], name='api_order_table_i_ffa28e_idx'),
+        ),
+    ]
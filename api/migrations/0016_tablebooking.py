@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_table_bookings(apps, schema_editor):
+    Order = apps.get_model('api', 'Order')
+    TableBooking = apps.get_model('api', 'TableBooking')
+
+    booked = set()
+    bookings = []
+
+    for order in Order.objects.filter(kind='booking').exclude(status='Отменён').exclude(table=None).order_by('id'):
+        day = timezone.localtime(order.date).date() if timezone.is_aware(order.date) else order.date.date()
+
+        if (day, order.table_id) not in booked:
+            booked.add((day, order.table_id))
+            bookings.append(TableBooking(table_id=order.table_id, order_id=order.id, date=day))
+
+    TableBooking.objects.bulk_create(bookings)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_order_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='table_booking', to='api.order')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='api.table')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='tablebooking',
+            constraint=models.UniqueConstraint(fields=('date', 'table'), name='unique_table_booking_per_day'),
+        ),
+        migrations.RunPython(fill_table_bookings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:02
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def fill_product_sales(apps, schema_editor):
+    OrderProduct = apps.get_model('api', 'OrderProduct')
+    ProductSalesDay = apps.get_model('api', 'ProductSalesDay')
+
+    OrderProduct.objects.filter(price=None).update(
+        price=models.Subquery(
+            apps.get_model('api', 'Product').objects.filter(id=models.OuterRef('product_id')).values('price')[:1]
+        )
+    )
+
+    ProductSalesDay.objects.bulk_create(
+        [
+            ProductSalesDay(product_id=row['product_id'], date=row['day'], quantity=row['quantity'], revenue=row['revenue'])
+            for row in OrderProduct.objects.exclude(order__status='Отменён').annotate(
+                day=TruncDate('order__date')
+            ).values('day', 'product_id').annotate(
+                quantity=Sum('count'),
+                revenue=Sum(
+                    F('count') * Coalesce('price', 'product__price'),
+                    output_field=models.DecimalField(max_digits=13, decimal_places=2)
+                )
+            )
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_tablebooking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderproduct',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=None, max_digits=11, null=True),
+        ),
+        migrations.CreateModel(
+            name='ProductSalesDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=13)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='api.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='productsalesday',
+            constraint=models.UniqueConstraint(fields=('date', 'product'), name='unique_product_sales_per_day'),
+        ),
+        migrations.RunPython(fill_product_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:03
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_employee_days(apps, schema_editor):
+    Order = apps.get_model('api', 'Order')
+    EmployeeDay = apps.get_model('api', 'EmployeeDay')
+
+    stats = defaultdict(lambda: [0, Decimal(0)])
+
+    for field in ('waiter_id', 'courier_id'):
+        for row in Order.objects.exclude(status='Отменён').exclude(**{field: None}).annotate(
+            day=TruncDate('date')
+        ).values('day', field).annotate(orders=Count('id'), revenue=Sum('total')):
+            stats[(row[field], row['day'])][0] += row['orders']
+            stats[(row[field], row['day'])][1] += row['revenue']
+
+    EmployeeDay.objects.bulk_create(
+        [
+            EmployeeDay(employee_id=employee_id, date=day, orders=orders, revenue=revenue)
+            for (employee_id, day), (orders, revenue) in stats.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_product_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=13)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='employeeday',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_employee_stats_per_day'),
+        ),
+        migrations.RunPython(fill_employee_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_employee_day_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product_sales', 'Продажи'), ('employees', 'Сотрудники')], max_length=20)),
+                ('from_date', models.DateField()),
+                ('to_date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Формируется'), ('done', 'Готов'), ('failed', 'Ошибка')], default='pending', max_length=10)),
+                ('file', models.FileField(blank=True, default=None, null=True, upload_to='reports/')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, default=None, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'from_date', 'to_date'], name='api_reportj_kind_9eb0e8_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('kind', 'from_date', 'to_date'), name='unique_active_report_job'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_cacheversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+    ]
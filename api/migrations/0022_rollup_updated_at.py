@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_reportjob_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeeday',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='productsalesday',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -19,6 +19,12 @@ class Shift(models.Model):
 class Role(models.Model):
     name = models.CharField(max_length=20)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+
     def __str__(self) -> str:
         return self.name
 
@@ -29,6 +35,14 @@ class User(AbstractUser):
 
     shifts = models.ManyToManyField(to=Shift)
 
+    token_version = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_role_id = instance.__dict__.get('role_id')
+        return instance
+
     def __str__(self) -> str:
         return f'{self.first_name} {self.last_name} | {self.role.name}'
 
@@ -70,6 +84,17 @@ class ProductIngredient(models.Model):
 
 
 class Order(models.Model):
+    BOOKING = 'booking'
+    DINE_IN = 'dine_in'
+    DELIVERY = 'delivery'
+
+    KINDS = [
+        (BOOKING, 'Бронь'),
+        (DINE_IN, 'В зале'),
+        (DELIVERY, 'Доставка'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS, default=DINE_IN)
     status = models.CharField(max_length=20)
     date = models.DateTimeField()
     address = models.CharField(max_length=100, null=True, default=None, blank=True)
@@ -82,15 +107,159 @@ class Order(models.Model):
 
     products = models.ManyToManyField(to=Product, through='OrderProduct')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'date']),
+            models.Index(fields=['client', '-date', '-id']),
+            models.Index(fields=['courier', '-date', '-id']),
+            models.Index(fields=['table', '-date', '-id']),
+        ]
+
     def __str__(self) -> str:
-        if self.products.exists():
+        if self.kind != Order.BOOKING:
             return f'Заказ №{self.id} от {self.date.day:02d}.{self.date.month:02d}.{self.date.year} в {self.date.hour:02d}:{self.date.minute}' + (' | Отменён' if self.status == 'Отменён' else '')
         else:
             return f'Бронь на {self.date.day:02d}.{self.date.month:02d}.{self.date.year}' + (' | Отменена' if self.status == 'Отменён' else '')  
 
 
+class TableBooking(models.Model):
+    table = models.ForeignKey(Table, related_name='bookings', on_delete=models.CASCADE)
+    order = models.OneToOneField(Order, related_name='table_booking', on_delete=models.CASCADE)
+
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'table'], name='unique_table_booking_per_day'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Столик №{self.table_id} на {self.date.day:02d}.{self.date.month:02d}.{self.date.year}'
+
+
 class OrderProduct(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
 
     count = models.IntegerField()
+    price = models.DecimalField(max_digits=11, decimal_places=2, null=True, default=None)
+
+
+class StockMovement(models.Model):
+    ORDER = 'order'
+    REPLENISHMENT = 'replenishment'
+    ADJUSTMENT = 'adjustment'
+
+    KINDS = [
+        (ORDER, 'Расход на заказ'),
+        (REPLENISHMENT, 'Пополнение'),
+        (ADJUSTMENT, 'Корректировка'),
+    ]
+
+    ingredient = models.ForeignKey(Ingredient, related_name='movements', on_delete=models.CASCADE)
+    order = models.ForeignKey(Order, related_name='stock_movements', on_delete=models.SET_NULL, null=True, default=None, blank=True)
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    delta = models.IntegerField()
+    date = models.DateTimeField(auto_now_add=True)
+    compacted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ingredient'], condition=models.Q(compacted=False), name='stock_movement_pending'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.ingredient.name} | {self.delta:+d}'
+
+
+class ProductSalesDay(models.Model):
+    product = models.ForeignKey(Product, related_name='daily_sales', on_delete=models.CASCADE)
+
+    date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(default=Decimal(0), max_digits=13, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_product_sales_per_day'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.product.name} | {self.date.day:02d}.{self.date.month:02d}.{self.date.year} | {self.quantity} шт.'
+
+
+class EmployeeDay(models.Model):
+    employee = models.ForeignKey(User, related_name='daily_stats', on_delete=models.CASCADE)
+
+    date = models.DateField()
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(default=Decimal(0), max_digits=13, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'date'], name='unique_employee_stats_per_day'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.employee.last_name} {self.employee.first_name} | {self.date.day:02d}.{self.date.month:02d}.{self.date.year} | {self.orders}'
+
+
+class ReportJob(models.Model):
+    PRODUCT_SALES = 'product_sales'
+    EMPLOYEES = 'employees'
+
+    KINDS = [
+        (PRODUCT_SALES, 'Продажи'),
+        (EMPLOYEES, 'Сотрудники'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUSES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Формируется'),
+        (DONE, 'Готов'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    from_date = models.DateField()
+    to_date = models.DateField()
+
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    file = models.FileField(upload_to='reports/', null=True, default=None, blank=True)
+    error = models.TextField(default='', blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, default=None, blank=True)
+    finished_at = models.DateTimeField(null=True, default=None, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'from_date', 'to_date'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_report_job'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'from_date', 'to_date']),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.get_kind_display()} с {self.from_date} по {self.to_date} | {self.get_status_display()}'
+
+
+class CacheVersion(models.Model):
+    namespace = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.namespace} v{self.version}'
@@ -0,0 +1,155 @@
+import importlib.util
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from types import SimpleNamespace
+from typing import Iterable, BinaryIO, Callable
+
+import django
+
+from cursed import settings
+
+
+__all__ = [
+    'LazyStory', 'build_pdf', 'register_fonts', 'report_styles', 'warm_up', 'can_render_in_parallel', 'render_in_parallel'
+]
+
+
+FONT_PATH = settings.BASE_DIR / 'fonts' / 'Verdana.ttf'
+TASKS_IN_FLIGHT_PER_PROCESS = 2
+
+
+_pools: dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+class LazyStory(list):
+    def __init__(self, flowables: Iterable, lookahead: int = 64):
+        super().__init__()
+
+        self._flowables = iter(flowables)
+        self._lookahead = lookahead
+        self._exhausted = False
+
+    def __len__(self):
+        self._fill()
+        return super().__len__()
+
+    def __getitem__(self, index):
+        self._fill()
+        return super().__getitem__(index)
+
+    def _fill(self):
+        while not self._exhausted and super().__len__() < self._lookahead:
+            try:
+                self.append(next(self._flowables))
+            except StopIteration:
+                self._exhausted = True
+
+
+@lru_cache
+def register_fonts():
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont('Verdana', str(FONT_PATH)))
+
+
+@lru_cache
+def report_styles() -> SimpleNamespace:
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle
+
+    register_fonts()
+
+    styles = getSampleStyleSheet()
+
+    return SimpleNamespace(
+        normal=ParagraphStyle('Normal', parent=styles['Normal'], fontName='Verdana'),
+        heading1=ParagraphStyle('Heading1', parent=styles['Heading1'], fontName='Verdana'),
+        heading2=ParagraphStyle('Heading2', parent=styles['Heading2'], fontName='Verdana'),
+        table=TableStyle([
+            ('GRID', (0, 0), (-1, -1), 1, 'black'),
+            ('BACKGROUND', (0, 0), (-1, 0), 'lightgrey'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Verdana'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+    )
+
+
+def warm_up():
+    import reportlab.platypus
+
+    report_styles()
+
+
+def build_pdf(flowables: Iterable, output: BinaryIO = None) -> BinaryIO:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+
+    if output is None:
+        output = SpooledTemporaryFile(max_size=settings.REPORT_SPOOL_SIZE)
+
+    register_fonts()
+
+    SimpleDocTemplate(output, pagesize=letter, pageCompression=1).build(LazyStory(flowables))
+    output.seek(0)
+
+    return output
+
+
+def can_render_in_parallel(processes: int) -> bool:
+    return processes > 1 and importlib.util.find_spec('pypdf') is not None
+
+
+def render_in_parallel(story: Callable[..., Iterable], tasks: Iterable[tuple], processes: int, output: BinaryIO = None) -> BinaryIO:
+    from pypdf import PdfReader, PdfWriter
+
+    if output is None:
+        output = SpooledTemporaryFile(max_size=settings.REPORT_SPOOL_SIZE)
+
+    pool = _get_pool(processes)
+    writer = PdfWriter()
+    pending = deque()
+
+    for args in tasks:
+        pending.append(pool.submit(_render, story, args))
+
+        if len(pending) >= processes * TASKS_IN_FLIGHT_PER_PROCESS:
+            writer.append(PdfReader(BytesIO(pending.popleft().result())))
+
+    while pending:
+        writer.append(PdfReader(BytesIO(pending.popleft().result())))
+
+    writer.write(output)
+    output.seek(0)
+
+    return output
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        if processes not in _pools:
+            _pools[processes] = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context(
+                    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                ),
+                initializer=_init_worker
+            )
+
+        return _pools[processes]
+
+
+def _init_worker():
+    django.setup()
+    warm_up()
+
+
+def _render(story: Callable[..., Iterable], args: tuple) -> bytes:
+    return build_pdf(story(*args), BytesIO()).getvalue()
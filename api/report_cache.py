@@ -0,0 +1,92 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+from cursed import settings
+
+
+__all__ = ['ReportCache', 'report_cache']
+
+
+class ReportCache:
+    def __init__(self, root: Path, max_bytes: int, max_age: float):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+
+    def key(self, *parts) -> str:
+        return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+    def open(self, key: str) -> BinaryIO | None:
+        path = self._path(key)
+
+        try:
+            file = path.open('rb')
+        except FileNotFoundError:
+            return None
+
+        if os.fstat(file.fileno()).st_mtime < time.time() - self.max_age:
+            file.close()
+            path.unlink(missing_ok=True)
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return file
+
+    def put(self, key: str, report: BinaryIO) -> Path:
+        path = self._path(key)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        descriptor, temporary = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            shutil.copyfileobj(report, file)
+
+        report.seek(0)
+
+        os.replace(temporary, path)
+
+        self.evict()
+
+        return path
+
+    def evict(self):
+        with self._lock:
+            now = time.time()
+            entries = []
+
+            for path in self.root.glob('*.pdf'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+
+                if stat.st_mtime < now - self.max_age:
+                    path.unlink(missing_ok=True)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def _path(self, key: str) -> Path:
+        return self.root / f'{key}.pdf'
+
+
+report_cache = ReportCache(Path(settings.MEDIA_ROOT) / 'report_cache', settings.REPORT_CACHE_MAX_BYTES, settings.REPORT_CACHE_MAX_AGE)
@@ -0,0 +1,114 @@
+import dataclasses
+import types
+import typing
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable
+
+from api import dto
+
+
+__all__ = ['to_primitive', 'serializer_for', 'json_default']
+
+
+LOCAL_OFFSET = timedelta(hours=4)
+PRIMITIVES = (int, str, bool, float, type(None))
+
+_serializers: dict[type, Callable[[Any], dict]] = {}
+
+
+def format_scalar(value: Any) -> Any:
+    if isinstance(value, datetime):
+        value = value + LOCAL_OFFSET
+        return f'{value.day:02d}.{value.month:02d}.{value.year} {value.hour:02d}:{value.minute:02d}'
+    if isinstance(value, date):
+        return f'{value.day:02d}.{value.month:02d}.{value.year}'
+    if isinstance(value, Decimal):
+        return float(value)
+
+    return value
+
+
+def to_primitive(value: Any) -> Any:
+    serializer = _serializers.get(type(value))
+
+    if serializer is not None:
+        return serializer(value)
+    if isinstance(value, (list, tuple)):
+        return [to_primitive(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_primitive(item) for key, item in value.items()}
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return serializer_for(type(value))(value)
+
+    return format_scalar(value)
+
+
+def json_default(value: Any) -> Any:
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return serializer_for(type(value))(value)
+    if isinstance(value, (date, Decimal)):
+        return format_scalar(value)
+
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def serializer_for(cls: type) -> Callable[[Any], dict]:
+    serializer = _serializers.get(cls)
+
+    if serializer is None:
+        serializer = _serializers[cls] = _compile(cls)
+
+    return serializer
+
+
+def _compile(cls: type) -> Callable[[Any], dict]:
+    hints = typing.get_type_hints(cls)
+    namespace = {'format_scalar': format_scalar, 'to_primitive': to_primitive}
+
+    items = ', '.join(
+        f'{field.name!r}: {_expression(hints[field.name], f"value.{field.name}", namespace, 0)}'
+        for field in dataclasses.fields(cls)
+    )
+
+    exec(f'def serialize(value):\n    return {{{items}}}\n', namespace)
+
+    return namespace['serialize']
+
+
+def _expression(hint: Any, expression: str, namespace: dict, depth: int) -> str:
+    origin = typing.get_origin(hint)
+    arguments = typing.get_args(hint)
+
+    if hint in PRIMITIVES:
+        return expression
+
+    if hint in (date, datetime, Decimal):
+        return f'format_scalar({expression})'
+
+    if origin in (typing.Union, types.UnionType):
+        options = [argument for argument in arguments if argument is not type(None)]
+
+        if len(options) == 1 and len(arguments) == 2:
+            inner = _expression(options[0], expression, namespace, depth)
+
+            return expression if inner == expression else f'(None if {expression} is None else {inner})'
+
+    if dataclasses.is_dataclass(hint):
+        name = f'serialize_{hint.__name__}'
+        namespace[name] = serializer_for(hint)
+
+        return f'{name}({expression})'
+
+    if origin is list and len(arguments) == 1:
+        item = f'item{depth}'
+        inner = _expression(arguments[0], item, namespace, depth + 1)
+
+        return expression if inner == item else f'[{inner} for {item} in {expression}]'
+
+    return f'to_primitive({expression})'
+
+
+for _cls in vars(dto).values():
+    if isinstance(_cls, type) and dataclasses.is_dataclass(_cls):
+        serializer_for(_cls)
@@ -1,11 +1,20 @@
 from datetime import date
+from typing import Iterator
+
+from django.db import transaction
 
 from api.models import User, Order, Shift, Table, Role
+from api.services.rollup_service import RollupService
+
+
+ITERATOR_CHUNK_SIZE = 500
 
 
 class EmployeeService:
-    def get_all_employees(self) -> list[User]:
-        return list(User.objects.exclude(role__name='Клиент'))
+    def get_all_employees(self) -> Iterator[User]:
+        return User.objects.exclude(role__name='Клиент').select_related('role').prefetch_related(
+            'shifts', 'assigns'
+        ).iterator(ITERATOR_CHUNK_SIZE)
 
     def appoint_employee_to_shift(self, employee: User, shift_date: date):
         if employee.role.name == 'Клиент':
@@ -37,15 +46,18 @@ class EmployeeService:
         if not order.address:
             raise ValueError('Назначить курьера можно только на заказ с доставкой')
 
-        order.courier = courier
-        order.save()
+        with transaction.atomic():
+            order.courier = courier
+            order.save()
+
+            RollupService().record_courier(order)
 
     def appoint_waiter_to_table(self, waiter: User, table: Table):
         if waiter.role.name != 'Официант':
             raise ValueError('На обслуживание стола можно назначить только официанта')
 
         table.waiter = waiter
-        table.save()
+        table.save(update_fields=['waiter'])
 
     def get_shifts(self) -> dict[str, list[User]]:
         result = {}
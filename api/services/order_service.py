@@ -1,7 +1,35 @@
+import base64
 from collections import defaultdict
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from itertools import chain
+from typing import Iterator
 
-from api.models import Order, Table, User, Product, OrderProduct, ProductIngredient
+from django.db import transaction, IntegrityError
+from django.db.models import Q, F, Case, When, Sum, Count
+from django.utils import timezone
+
+from api.availability import availability
+from api.broadcast import get_broadcaster
+from api.dto import OrderDTO, OrderProductDTO, ORDERS_BATCH_SIZE
+from api.invalidation import invalidation, TABLES
+from api.models import Order, Table, User, Product, OrderProduct, ProductIngredient, Ingredient, StockMovement, TableBooking, ProductSalesDay
+from api.services.product_service import with_balance
+from api.services.rollup_service import RollupService
+from cursed import settings
+
+
+AVAILABILITY_MAX_DAYS = 90
+
+
+class StockShortageError(ValueError):
+    def __init__(self, shortages: list[dict]):
+        self.shortages = shortages
+
+        super().__init__(
+            'Недостаточно продуктов на складе для: ' + ', '.join(
+                sorted({product for s in shortages for product in s['products']})
+            )
+        )
 
 
 class OrderService:
@@ -9,14 +37,36 @@ class OrderService:
         if order.status == 'Обслужен':
             order.table.client = None
 
-            order.table.save()
+            order.table.save(update_fields=['client'])
+
+        with transaction.atomic():
+            cancelled = status == 'Отменён' and order.status != 'Отменён'
+
+            order.status = status
+            order.save()
 
-        order.status = status
-        order.save()
+            if cancelled:
+                self._release_booking(order)
+
+                if order.kind != Order.BOOKING:
+                    RollupService().record_cancellation(order)
+
+        if order.kind != Order.BOOKING and get_broadcaster().has_subscribers:
+            transaction.on_commit(lambda: get_broadcaster().publish(OrderDTO.from_model(order)))
 
     def cancel_order(self, order: Order) -> bool:
-        order.status = 'Отменён'
-        order.save()
+        with transaction.atomic():
+            order.status = 'Отменён'
+            order.save()
+
+            self._release_booking(order)
+
+    def _release_booking(self, order: Order):
+        if order.kind != Order.BOOKING:
+            return
+
+        if TableBooking.objects.filter(order=order).delete()[0]:
+            invalidation.bump(TABLES)
 
     def create_order(
             self,
@@ -28,41 +78,138 @@ class OrderService:
         if not (table or address):
             raise ValueError('Необходимо указать хотя бы один из аргументов: стол или адрес')
 
-        if table is not None:
-            if not table.waiter:
-                raise ValueError('Этот столик не обслуживает ни один официант')
+        if table is not None and not table.waiter:
+            raise ValueError('Этот столик не обслуживает ни один официант')
 
-            table.client = client
-            table.save()
+        if any(count <= 0 for _, count in products):
+            raise ValueError('Количество каждой позиции должно быть больше нуля')
 
-        order = Order(
-            status='Принят',
-            date=datetime.now(),
-            client=client,
-            table=table,
-            address=address,
-            waiter_id=table.waiter_id,
-            total=sum([p.price * count for p, count in products])
-        )
-        order.save()
+        with transaction.atomic():
+            required, consumers = self._required_ingredients(products)
 
-        for product, count in products:
-            for consumption in ProductIngredient.objects.filter(product=product):
-                ingredients_consumption = consumption.count * count
+            if not settings.STOCK_LEDGER:
+                self._reserve_ingredients(required, consumers)
 
-                if consumption.ingredient.count < ingredients_consumption:
-                    raise ValueError(f'Недостаточно продуктов на складе для: {product.name}')
+            if table is not None:
+                table.client = client
+                table.save(update_fields=['client'])
 
-                consumption.ingredient.count -= ingredients_consumption
+            order = Order(
+                kind=Order.DELIVERY if address else Order.DINE_IN,
+                status='Принят',
+                date=timezone.now(),
+                client=client,
+                table=table,
+                address=address,
+                waiter_id=table.waiter_id if table else None,
+                total=sum([p.price * count for p, count in products])
+            )
+            order.save()
 
-                consumption.ingredient.save()
-            
-            OrderProduct.objects.create(order=order, product=product, count=count)
+            OrderProduct.objects.bulk_create(
+                [OrderProduct(order=order, product=product, count=count, price=product.price) for product, count in products]
+            )
+
+            RollupService().record_order(order, [(product.id, count, product.price) for product, count in products])
+
+            if settings.STOCK_LEDGER:
+                self._record_consumption(order, required, consumers)
+
+            transaction.on_commit(
+                lambda: get_broadcaster().publish(
+                    OrderDTO(
+                        order.id,
+                        order.date,
+                        order.address,
+                        order.table_id,
+                        order.status,
+                        [OrderProductDTO(product.id, product.name, product.price, count) for product, count in products]
+                    )
+                )
+            )
 
         return order
 
-    def get_orders(self, with_status: str | None, with_tables: list[int]) -> list[Order]:
-        orders = Order.objects
+    def _required_ingredients(self, products: list[tuple[Product, int]]) -> tuple[dict[int, int], dict[int, set[str]]]:
+        counts = defaultdict(int)
+        names = {}
+
+        for product, count in products:
+            counts[product.id] += count
+            names[product.id] = product.name
+
+        required = defaultdict(int)
+        consumers = defaultdict(set)
+
+        for product_id, ingredient_id, quantity in ProductIngredient.objects.filter(
+            product_id__in=counts.keys()
+        ).values_list('product_id', 'ingredient_id', 'count'):
+            required[ingredient_id] += quantity * counts[product_id]
+            consumers[ingredient_id].add(names[product_id])
+
+        return required, consumers
+
+    def _reserve_ingredients(self, required: dict[int, int], consumers: dict[int, set[str]]):
+        if not required:
+            return
+
+        savepoint = transaction.savepoint()
+
+        updated = Ingredient.objects.filter(
+            Q(*[Q(id=ingredient_id, count__gte=quantity) for ingredient_id, quantity in required.items()], _connector=Q.OR)
+        ).update(
+            count=Case(
+                *[When(id=ingredient_id, then=F('count') - quantity) for ingredient_id, quantity in required.items()],
+                default=F('count')
+            )
+        )
+
+        if updated != len(required):
+            transaction.savepoint_rollback(savepoint)
+
+            raise self._shortage_error(
+                required,
+                consumers,
+                Ingredient.objects.filter(id__in=required.keys()).values_list('id', 'name', 'count')
+            )
+
+        transaction.savepoint_commit(savepoint)
+
+    def _record_consumption(self, order: Order, required: dict[int, int], consumers: dict[int, set[str]]):
+        if not required:
+            return
+
+        list(Ingredient.objects.select_for_update().filter(id__in=required.keys()).order_by('id').values_list('id'))
+
+        balances = list(with_balance(Ingredient.objects.filter(id__in=required.keys())).values_list('id', 'name', 'balance'))
+
+        if any(balance < required[ingredient_id] for ingredient_id, _, balance in balances):
+            raise self._shortage_error(required, consumers, balances)
+
+        StockMovement.objects.bulk_create(
+            [
+                StockMovement(ingredient_id=ingredient_id, order=order, kind=StockMovement.ORDER, delta=-quantity)
+                for ingredient_id, quantity in required.items()
+            ]
+        )
+
+    def _shortage_error(self, required: dict[int, int], consumers: dict[int, set[str]], stock) -> StockShortageError:
+        return StockShortageError(
+            [
+                {
+                    'ingredient_id': ingredient_id,
+                    'ingredient': name,
+                    'required': required[ingredient_id],
+                    'available': available,
+                    'products': sorted(consumers[ingredient_id])
+                }
+                for ingredient_id, name, available in stock
+                if available < required[ingredient_id]
+            ]
+        )
+
+    def get_orders(self, with_status: str | None, with_tables: list[int]) -> Iterator[Order]:
+        orders = Order.objects.exclude(kind=Order.BOOKING)
 
         if with_status:
             orders = orders.filter(status=with_status)
@@ -70,84 +217,142 @@ class OrderService:
         if with_tables:
             orders = orders.filter(table__id__in=with_tables)
 
-        return list(filter(lambda o: o.products.exists(), orders.order_by('-date').all()))
+        return orders.order_by('-date').iterator(ORDERS_BATCH_SIZE)
+
+    def get_active_orders(self) -> Iterator[Order]:
+        return chain(self.get_orders('Принят', []), self.get_orders('Готовится', []))
+
+    def get_active_orders_stamp(self) -> tuple[int, int, int]:
+        stamp = Order.objects.exclude(kind=Order.BOOKING).filter(status__in=['Принят', 'Готовится']).aggregate(
+            accepted=Count('id', filter=Q(status='Принят')),
+            cooking=Count('id', filter=Q(status='Готовится')),
+            ids=Sum('id')
+        )
+
+        return stamp['accepted'], stamp['cooking'], stamp['ids'] or 0
+
+    def get_order_history(self) -> Iterator[Order]:
+        return Order.objects.exclude(kind=Order.BOOKING).order_by('date', 'id').iterator(ORDERS_BATCH_SIZE)
+
+    def get_user_orders(self, user: User, limit: int, after: tuple[datetime, int] | None = None) -> list[Order]:
+        role = user.role.name if user.role else None
+
+        if role == 'Официант':
+            orders = Order.objects.filter(table_id__in=list(Table.objects.filter(waiter_id=user.id).values_list('id', flat=True)))
+        elif role == 'Курьер':
+            orders = Order.objects.filter(courier_id=user.id)
+        else:
+            orders = Order.objects.filter(client_id=user.id)
+
+        orders = orders.exclude(kind=Order.BOOKING)
+
+        if after is not None:
+            after_date, after_id = after
+            orders = orders.filter(Q(date__lt=after_date) | Q(date=after_date, id__lt=after_id))
+
+        return list(orders.order_by('-date', '-id')[:limit])
+
+    def encode_cursor(self, order: Order) -> str:
+        return base64.urlsafe_b64encode(f'{order.date.isoformat()}|{order.id}'.encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> tuple[datetime, int]:
+        try:
+            order_date, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+
+            return datetime.fromisoformat(order_date), int(order_id)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError('Некорректный курсор')
 
     def book_table(self, client: User, time: datetime, table: Table):
-        if any(
-            list(
-                map(
-                    lambda o: not o.products.exists(),
-                    Order.objects.filter(date__day=time.day, date__month=time.month, date__year=time.year, table=table).exclude(status='Отменён')
-                )
-            ) + list(
-                map(
-                    lambda o: not o.products.exists(),
-                    Order.objects.filter(date__gte=time, client_id=client.id).exclude(status='Отменён')
-                )
-            )
-        ):
+        day = time.date()
+
+        if Order.objects.filter(
+            kind=Order.BOOKING,
+            client_id=client.id,
+            date__gte=time
+        ).exclude(status='Отменён').exists():
             raise ValueError('Столик уже забронирован')
 
-        order = Order(status='Принят', date=time, client=client, table=table)
-        order.save()
+        try:
+            with transaction.atomic():
+                order = Order(kind=Order.BOOKING, status='Принят', date=time, client=client, table=table)
+                order.save()
 
-    def get_all_bookings(self) -> list[Order]:
-        result = []
+                TableBooking.objects.create(table=table, order=order, date=day)
+        except IntegrityError:
+            availability.mark(day, table.id)
 
-        for order in Order.objects.all():
-            if not order.products.exists():
-                result.append(order)
+            raise ValueError('Столик уже забронирован')
 
-        return result
+        transaction.on_commit(lambda: availability.mark(day, table.id))
 
-    def get_available_tables(self, time: date) -> list[Table]:
-        result = []
+    def get_all_bookings(self) -> list[Order]:
+        return list(Order.objects.filter(kind=Order.BOOKING).all())
 
-        current_date = date.today()
+    def get_available_tables(self, time: date, include_seated: bool = False) -> list[Table]:
+        day = time.date() if isinstance(time, datetime) else time
 
         tables = Table.objects.all()
 
-        if current_date == date:
+        if day == date.today() and not include_seated:
             tables = tables.filter(client=None)
 
-        booked_tables = list(
-            map(
-                lambda order: order.table.id,
-                filter(
-                    lambda o: not o.products.exists(),
-                    Order.objects.filter(date__day=time.day, date__month=time.month, date__year=time.year)
-                )
-            )
-        )
+        booked = availability.booked(day)
 
-        for table in tables:
-            if table.id not in booked_tables:
-                result.append(table)
+        return [table for table in tables if not booked >> table.id & 1]
 
-        return result
+    def get_tables_stamp(self, day: date) -> str:
+        seated = Table.objects.exclude(client=None).order_by('id').values_list('id', flat=True)
 
-    def get_user_booking(self, client: User) -> Order | None:
-        orders = Order.objects.filter(client=client, date__gte=date.today()).exclude(status='Отменён')
-        orders = filter(lambda order: not order.products.exists(), orders)
+        return f'{day}|{availability.booked(day)}|{",".join(str(table_id) for table_id in seated)}'
+
+    def get_availability_matrix(self, from_day: date, to_day: date) -> tuple[list[int], list[date], list[list[bool]]]:
+        if to_day < from_day:
+            raise ValueError('Дата окончания периода раньше даты начала')
+
+        if (to_day - from_day).days >= AVAILABILITY_MAX_DAYS:
+            raise ValueError(f'Период не может быть длиннее {AVAILABILITY_MAX_DAYS} дней')
 
-        return next(iter(orders), None)
+        days = [from_day + timedelta(days=offset) for offset in range((to_day - from_day).days + 1)]
+        tables = list(Table.objects.order_by('id').values_list('id', 'client_id'))
+        booked = availability.booked_range(days)
+        today = date.today()
+
+        return (
+            [table_id for table_id, _ in tables],
+            days,
+            [
+                [
+                    not booked[day] >> table_id & 1 and not (day == today and client_id is not None)
+                    for day in days
+                ]
+                for table_id, client_id in tables
+            ]
+        )
+
+    def get_user_booking(self, client: User) -> Order | None:
+        return Order.objects.filter(
+            kind=Order.BOOKING,
+            client=client,
+            date__gte=date.today()
+        ).exclude(status='Отменён').order_by('date').first()
 
     def get_order(self, order_id: int) -> Order:
         return Order.objects.get(id=order_id)
 
-    def get_delivery_orders(self) -> list[Order]:
-        return list(Order.objects.filter(status='Передан на доставку').exclude(courier=None).all())
+    def get_delivery_orders(self) -> Iterator[Order]:
+        return Order.objects.filter(status='Передан на доставку').exclude(courier=None).iterator(ORDERS_BATCH_SIZE)
 
-    def get_unfinished_delivery_orders(self) -> list[Order]:
-        return list(Order.objects.filter(courier=None).all())
+    def get_unfinished_delivery_orders(self) -> Iterator[Order]:
+        return Order.objects.filter(kind=Order.DELIVERY, courier=None).iterator(ORDERS_BATCH_SIZE)
 
     def analyze_sales(self, from_date: date, to_date: date) -> dict[Product, int]:
-        orders = Order.objects.filter(date__gte=from_date).filter(date__lte=to_date)
-
-        result = defaultdict(int)
+        sales = ProductSalesDay.objects.filter(
+            date__gte=from_date,
+            date__lte=to_date
+        ).values('product_id').annotate(quantity=Sum('quantity')).order_by('-quantity')
 
-        for order in orders:
-            for position in OrderProduct.objects.filter(order=order):
-                result[position] += position.count
+        sales = list(sales)
+        products = Product.objects.in_bulk([s['product_id'] for s in sales])
 
-        return result
+        return {products[s['product_id']]: s['quantity'] for s in sales}
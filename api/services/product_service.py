@@ -1,23 +1,119 @@
+from collections import defaultdict
 from decimal import Decimal
+from typing import Iterator
 
-from api.models import Product, Ingredient, ProductIngredient
+from django.db import transaction
+from django.db.models import Q, F, Sum, Max, Case, When, QuerySet, Prefetch
+from django.db.models.functions import Coalesce
+
+from api.dto import MenuItemDTO
+from api.invalidation import invalidation, INGREDIENTS
+from api.menu import cookable_menu
+from api.models import Product, Ingredient, ProductIngredient, StockMovement
+from cursed import settings
+
+
+ITERATOR_CHUNK_SIZE = 500
+
+
+def with_balance(ingredients: QuerySet) -> QuerySet:
+    return ingredients.annotate(
+        balance=F('count') + Coalesce(Sum('movements__delta', filter=Q(movements__compacted=False)), 0)
+    )
 
 
 class ProductService:
     def get_available_ingredients(self) -> list[Ingredient]:
+        if settings.STOCK_LEDGER:
+            return list(self._current(with_balance(Ingredient.objects.all()).filter(balance__gt=0)))
+
         return list(Ingredient.objects.filter(count__gt=0).all())
 
     def replenish_ingredients(self, names: list[str], counts: list[int]) -> None:
+        existing = {ingredient.name: ingredient for ingredient in Ingredient.objects.filter(name__in=names)}
+
+        for name in names:
+            if name not in existing:
+                existing[name] = Ingredient.objects.create(name=name, count=0)
+
+        invalidation.bump(INGREDIENTS)
+
+        if settings.STOCK_LEDGER:
+            StockMovement.objects.bulk_create(
+                [
+                    StockMovement(ingredient=existing[name], kind=StockMovement.REPLENISHMENT, delta=count)
+                    for (name, count) in zip(names, counts)
+                ]
+            )
+            return
+
         for (name, count) in zip(names, counts):
-            if Ingredient.objects.filter(name=name).first() is None:
-                ingredient = Ingredient.objects.create(name=name, count=0)
+            Ingredient.objects.filter(id=existing[name].id).update(count=F('count') + count)
+
+    def adjust_ingredient(self, ingredient_id: int, delta: int) -> None:
+        with transaction.atomic():
+            ingredients = with_balance(Ingredient.objects.filter(id=ingredient_id)) if settings.STOCK_LEDGER else \
+                Ingredient.objects.filter(id=ingredient_id).annotate(balance=F('count'))
+
+            list(Ingredient.objects.select_for_update().filter(id=ingredient_id).values_list('id'))
+            balance = ingredients.values_list('balance', flat=True).first()
+
+            if balance is None:
+                raise ValueError('Ингредиент не найден')
+
+            if balance + delta < 0:
+                raise ValueError('Остаток ингредиента не может стать отрицательным')
+
+            invalidation.bump(INGREDIENTS)
+
+            if settings.STOCK_LEDGER:
+                StockMovement.objects.create(ingredient_id=ingredient_id, kind=StockMovement.ADJUSTMENT, delta=delta)
             else:
-                ingredient = Ingredient.objects.get(name=name)
-            ingredient.count += count
-            ingredient.save()
+                Ingredient.objects.filter(id=ingredient_id).update(count=F('count') + delta)
+
+    def compact_stock_ledger(self, batch_size: int = 5000) -> int:
+        compacted = 0
+
+        while True:
+            with transaction.atomic():
+                pending = list(
+                    StockMovement.objects.select_for_update().filter(compacted=False)
+                    .order_by('id').values_list('id', 'ingredient_id', 'delta')[:batch_size]
+                )
+
+                if not pending:
+                    return compacted
+
+                deltas = defaultdict(int)
+                for _, ingredient_id, delta in pending:
+                    deltas[ingredient_id] += delta
+
+                Ingredient.objects.filter(id__in=deltas.keys()).update(
+                    count=Case(
+                        *[When(id=ingredient_id, then=F('count') + delta) for ingredient_id, delta in deltas.items()],
+                        default=F('count')
+                    )
+                )
+                StockMovement.objects.filter(id__in=[movement_id for movement_id, _, _ in pending]).update(compacted=True)
+
+            compacted += len(pending)
+
+    def get_stock_stamp(self) -> str:
+        if settings.STOCK_LEDGER:
+            return f'{StockMovement.objects.aggregate(last=Max("id"))["last"]}'
 
-    def get_all_ingredients(self) -> list[Ingredient]:
-        return list(Ingredient.objects.all())
+        return f'{Ingredient.objects.aggregate(total=Sum("count"))["total"]}'
+
+    def get_all_ingredients(self) -> Iterator[Ingredient]:
+        if settings.STOCK_LEDGER:
+            return self._current(with_balance(Ingredient.objects.all()))
+
+        return Ingredient.objects.all().iterator(ITERATOR_CHUNK_SIZE)
+
+    def _current(self, ingredients: QuerySet) -> Iterator[Ingredient]:
+        for ingredient in ingredients.iterator(ITERATOR_CHUNK_SIZE):
+            ingredient.count = ingredient.balance
+            yield ingredient
 
     def add_product(self, name: str, price: Decimal, ingredients: list[Ingredient], counts: list[int]):
         product = Product(name=name, price=price)
@@ -36,13 +132,23 @@ class ProductService:
         ProductIngredient.objects.filter(product_id=product_id).delete()
 
         for (ingredient, quantity) in zip(ingredients, counts):
-            ProductIngredient(product=product, ingredient=ingredient, quantity=quantity).save()
+            ProductIngredient(product=product, ingredient=ingredient, count=quantity).save()
 
     def delete_product(self, product_id: int):
         Product.objects.get(id=product_id).delete()
 
-    def get_all_products(self) -> list[Product]:
-        return list(Product.objects.all())
+    def get_all_products(self, with_ingredients: bool = False) -> Iterator[Product]:
+        products = Product.objects.all()
+
+        if with_ingredients:
+            products = products.prefetch_related(
+                Prefetch('productingredient_set', queryset=ProductIngredient.objects.select_related('ingredient'))
+            )
+
+        return products.iterator(ITERATOR_CHUNK_SIZE)
+
+    def get_menu(self) -> list[MenuItemDTO]:
+        return cookable_menu.items()
 
     def get_product(self, product_id: int) -> Product | None:
         try:
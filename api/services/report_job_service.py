@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.files import File
+from django.db import transaction, IntegrityError, connection
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import ReportJob
+from api.services.report_service import ReportService
+from cursed import settings
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.REPORT_WORKERS, thread_name_prefix='report')
+
+        return _executor
+
+
+class ReportJobService:
+    def submit(self, kind: str, from_date: date, to_date: date) -> ReportJob:
+        self.expire()
+
+        active = ReportJob.objects.filter(kind=kind, from_date=from_date, to_date=to_date)
+
+        if to_date < date.today():
+            if job := active.filter(status=ReportJob.DONE).order_by('-finished_at').first():
+                return job
+
+        if job := active.filter(status__in=[ReportJob.PENDING, ReportJob.RUNNING]).first():
+            return job
+
+        try:
+            with transaction.atomic():
+                job = ReportJob.objects.create(kind=kind, from_date=from_date, to_date=to_date)
+        except IntegrityError:
+            return active.exclude(status=ReportJob.FAILED).order_by('-id').first() or self.submit(kind, from_date, to_date)
+
+        transaction.on_commit(lambda: _get_executor().submit(self._run, job.id))
+
+        return job
+
+    def get(self, job_id: int) -> ReportJob | None:
+        return ReportJob.objects.filter(id=job_id).first()
+
+    def expire(self):
+        now = timezone.now()
+
+        ReportJob.objects.filter(
+            status=ReportJob.PENDING,
+            created_at__lt=now - timedelta(seconds=settings.REPORT_QUEUE_TIMEOUT)
+        ).update(status=ReportJob.FAILED, error='Отчёт не был взят в работу', finished_at=now)
+
+        ReportJob.objects.filter(
+            Q(started_at__lt=now - timedelta(seconds=settings.REPORT_JOB_TIMEOUT))
+            | Q(started_at=None, created_at__lt=now - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)),
+            status=ReportJob.RUNNING
+        ).update(status=ReportJob.FAILED, error='Превышено время формирования отчёта', finished_at=now)
+
+        for job in ReportJob.objects.filter(
+            status__in=[ReportJob.DONE, ReportJob.FAILED],
+            finished_at__lt=timezone.now() - timedelta(seconds=settings.REPORT_TTL)
+        ):
+            if job.file:
+                job.file.delete(save=False)
+
+            job.delete()
+
+    def _run(self, job_id: int):
+        try:
+            if not ReportJob.objects.filter(id=job_id, status=ReportJob.PENDING).update(
+                status=ReportJob.RUNNING, started_at=timezone.now()
+            ):
+                return
+
+            job = ReportJob.objects.get(id=job_id)
+
+            _, report = ReportService().get_cached_report(job.kind, job.from_date, job.to_date)
+
+            with report:
+                job.file.save(f'{job.kind}-{job.from_date}-{job.to_date}-{job.id}.pdf', File(report), save=False)
+
+            job.status = ReportJob.DONE
+            job.finished_at = timezone.now()
+            job.save()
+        except Exception as e:
+            ReportJob.objects.filter(id=job_id).update(status=ReportJob.FAILED, error=f'{e}', finished_at=timezone.now())
+        finally:
+            connection.close()
@@ -1,193 +1,275 @@
-from datetime import date, timedelta
-from typing import Any
+from datetime import date, datetime, timedelta
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Any, BinaryIO, Iterable, Iterator
 
-from django.db.models import Sum, F
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from django.db.models import Sum, Count, Max
 
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-from api.models import User, Order, OrderProduct
+from api.dto import EmployeeReportDTO, EmployeeDayDTO
+from api.invalidation import invalidation, PRODUCTS, EMPLOYEES, ROLES, SHIFTS
+from api.models import User, ProductSalesDay, EmployeeDay, ReportJob
+from api.pdf import build_pdf, report_styles, can_render_in_parallel, render_in_parallel
+from api.report_cache import report_cache
+from cursed import settings
 
 
 __all__ = ['ReportService']
 
 
-pdfmetrics.registerFont(TTFont('Verdana', 'fonts/Verdana.ttf'))
-styles = getSampleStyleSheet()
-normal = ParagraphStyle('Normal', parent=styles['Normal'], fontName='Verdana')
-heading1 = ParagraphStyle('Heading1', parent=styles['Heading1'], fontName='Verdana')
-heading2 = ParagraphStyle('Heading2', parent=styles['Heading2'], fontName='Verdana')
-table_style = TableStyle([
-    ('GRID', (0, 0), (-1, -1), 1, 'black'),
-    ('BACKGROUND', (0, 0), (-1, 0), 'lightgrey'),
-    ('FONTNAME', (0, 0), (-1, -1), 'Verdana'),
-    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-])
+REPORT_FORMAT_VERSION = 2
+REPORT_ROWS_CHUNK_SIZE = 2000
+REPORT_TABLE_ROWS = 40
+REPORT_SECTIONS_PER_TASK = 10
 
 
 class ReportService:
-    def generate_user_report(self, user: User) -> list[dict[str, Any]]:
+    def generate_user_report(self, user: User, days: int = 7) -> list[dict[str, Any]]:
+        if user.role.name not in ('Официант', 'Курьер'):
+            raise ValueError("Неподдерживаемая роль пользователя")
+
         today = date.today()
-        seven_days_ago = today - timedelta(days=6)
+        first_day = today - timedelta(days=days - 1)
+
+        stats = {
+            day: (orders, revenue)
+            for day, orders, revenue in EmployeeDay.objects.filter(
+                employee=user,
+                date__range=(first_day, today)
+            ).values_list('date', 'orders', 'revenue')
+        }
 
         report_data = []
 
-        for day_offset in range(7):
-            current_date = seven_days_ago + timedelta(day_offset)
-            orders_for_day = self._get_orders_for_user_and_date(user, current_date)
+        for day_offset in range(days):
+            current_date = first_day + timedelta(day_offset)
+            orders, total = stats.get(current_date, (0, 0))
             report_data.append(
                 {
                     'date': f'{current_date.day:02d}.{current_date.month:02d}',
-                    'orders': orders_for_day.count(),
-                    'total': sum([o.total for o in orders_for_day])
+                    'orders': orders,
+                    'total': total
                 }
             )
 
         return report_data
 
-    def _get_orders_for_user_and_date(self, user: User, current_date: date):
-        if user.role.name == 'Официант':
-            orders_for_day = Order.objects.filter(
-                waiter=user,
-                date__year=current_date.year,
-                date__month=current_date.month,
-                date__day=current_date.day
-            )
-        elif user.role.name == 'Курьер':
-            orders_for_day = Order.objects.filter(
-                courier=user,
-                date__year=current_date.year,
-                date__month=current_date.month,
-                date__day=current_date.day
-            )
+    def _day(self, value: date) -> date:
+        return value.date() if isinstance(value, datetime) else value
+
+    def generate_report(self, kind: str, from_date: date, to_date: date, buffer: BinaryIO = None) -> BinaryIO:
+        if kind == ReportJob.PRODUCT_SALES:
+            return self.generate_product_sales_report(from_date, to_date, buffer)
+
+        return self.generate_employees_report(from_date, to_date, buffer)
+
+    def get_report_version(self, kind: str, from_date: date, to_date: date) -> str:
+        from_date, to_date = self._day(from_date), self._day(to_date)
+
+        if kind == ReportJob.PRODUCT_SALES:
+            rows, namespaces = ProductSalesDay.objects, (PRODUCTS,)
         else:
-            raise ValueError("Неподдерживаемая роль пользователя")
+            rows, namespaces = EmployeeDay.objects, (EMPLOYEES, ROLES, SHIFTS)
+
+        stamp = {namespace: invalidation.version(namespace) for namespace in namespaces} | rows.filter(
+            date__range=(from_date, to_date)
+        ).aggregate(rows=Count('id'), updated_at=Max('updated_at'))
+
+        return ','.join(f'{name}={value}' for name, value in sorted(stamp.items()))
+
+    def get_report_key(self, kind: str, from_date: date, to_date: date) -> str:
+        return report_cache.key(
+            REPORT_FORMAT_VERSION,
+            kind,
+            self._day(from_date),
+            self._day(to_date),
+            'parallel' if kind == ReportJob.EMPLOYEES and can_render_in_parallel(settings.REPORT_RENDER_PROCESSES) else 'serial',
+            self.get_report_version(kind, from_date, to_date)
+        )
+
+    def get_cached_report(self, kind: str, from_date: date, to_date: date, key: str = None) -> tuple[str, BinaryIO]:
+        key = key or self.get_report_key(kind, from_date, to_date)
+
+        if (file := report_cache.open(key)) is not None:
+            return key, file
 
-        return orders_for_day
+        report = self.generate_report(kind, from_date, to_date)
+        report_cache.put(key, report)
 
-    def generate_product_sales_report(self, from_date: date, to_date: date, buffer):
-        sold_products = OrderProduct.objects.filter(
-            order__date__date__gte=from_date,
-            order__date__date__lte=to_date
-        ).values('product__name', 'product__price').annotate(
-            total_quantity=Sum('count'),
-            total_price=F('product__price') * F('total_quantity')
-        ).order_by('-total_quantity')
+        return key, report
 
-        most_popular_product = sold_products.first()
-        most_profit_product = sold_products.order_by('-total_price').first()
+    def generate_product_sales_report(self, from_date: date, to_date: date, buffer: BinaryIO = None) -> BinaryIO:
+        sold_products = list(
+            ProductSalesDay.objects.filter(
+                date__gte=self._day(from_date),
+                date__lte=self._day(to_date)
+            ).values('product__name', 'product__price').annotate(
+                total_quantity=Sum('quantity'),
+                total_price=Sum('revenue')
+            ).order_by('-total_quantity')
+        )
 
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        
-        story = [
-            Paragraph(f"Продажи с {from_date.day:02d}.{from_date.month:02d}.{from_date.year} по {to_date.day:02d}.{to_date.month:02d}.{to_date.year}", heading1),
-            Spacer(1, 0.25 * inch)
-        ]
+        return build_pdf(self._product_sales_story(from_date, to_date, sold_products), buffer)
+
+    def _product_sales_story(self, from_date: date, to_date: date, sold_products: list[dict[str, Any]]):
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer
+
+        styles = report_styles()
+
+        yield Paragraph(f"Продажи с {from_date.day:02d}.{from_date.month:02d}.{from_date.year} по {to_date.day:02d}.{to_date.month:02d}.{to_date.year}", styles.heading1)
+        yield Spacer(1, 0.25 * inch)
 
         for product in sold_products:
-            story.append(Paragraph(f"Название: {product['product__name']}", normal))
-            story.append(Paragraph(f"Количество: {product['total_quantity']} шт.", normal))
-            story.append(Paragraph(f"Цена: {product['product__price']} р.", normal))
-            story.append(Paragraph(f"Общая цена: {product['total_price']} р.", normal))
-            story.append(Spacer(1, 0.15 * inch))
-
-        story.append(Paragraph(f"Итого: {sum([p['total_price'] for p in sold_products])} р.", heading2))
-
-        story.append(Paragraph("Популярная позиция меню:", heading2))
-        story.append(Paragraph(f"Название: {most_popular_product['product__name']}", normal))
-        story.append(Paragraph(f"Количество: {most_popular_product['total_quantity']} шт.", normal))
-        story.append(Paragraph(f"Цена: {most_popular_product['product__price']} р.", normal))
-        story.append(Paragraph(f"Общая цена: {most_popular_product['total_price']} р.", normal))
-
-        story.append(Spacer(1, 0.15 * inch))
-
-        story.append(Paragraph("Наибольшая выручка:", heading2))
-        story.append(Paragraph(f"Название: {most_profit_product['product__name']}", normal))
-        story.append(Paragraph(f"Количество: {most_profit_product['total_quantity']} шт.", normal))
-        story.append(Paragraph(f"Цена: {most_profit_product['product__price']} р.", normal))
-        story.append(Paragraph(f"Общая цена: {most_profit_product['total_price']} р.", normal))
-
-        doc.build(story)
-        return buffer
-
-    def generate_employees_report(self, from_date: date, to_date: date, buffer):
-        employees = User.objects.filter(role__name__in=['Официант', 'Курьер'])
-
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        story = [
-            Paragraph(
-                f"Отчет по сотрудникам с {from_date.day:02d}.{from_date.month:02d}.{from_date.year} по {to_date.day:02d}.{to_date.month:02d}.{to_date.year}",
-                heading1
-            ),
-            Spacer(1, 0.25 * inch)
-        ]
+            yield from self._product_paragraphs(product)
+            yield Spacer(1, 0.15 * inch)
+
+        yield Paragraph(f"Итого: {sum([p['total_price'] for p in sold_products])} р.", styles.heading2)
+
+        if not sold_products:
+            return
+
+        yield Paragraph("Популярная позиция меню:", styles.heading2)
+        yield from self._product_paragraphs(sold_products[0])
+
+        yield Spacer(1, 0.15 * inch)
+
+        yield Paragraph("Наибольшая выручка:", styles.heading2)
+        yield from self._product_paragraphs(max(sold_products, key=lambda p: p['total_price']))
+
+    def _product_paragraphs(self, product: dict[str, Any]):
+        from reportlab.platypus import Paragraph
+
+        styles = report_styles()
+
+        yield Paragraph(f"Название: {product['product__name']}", styles.normal)
+        yield Paragraph(f"Количество: {product['total_quantity']} шт.", styles.normal)
+        yield Paragraph(f"Цена: {product['product__price']} р.", styles.normal)
+        yield Paragraph(f"Общая цена: {product['total_price']} р.", styles.normal)
+
+    def get_employees_report_data(self, from_date: date, to_date: date) -> list[EmployeeReportDTO]:
+        return list(self.iter_employees_report_data(from_date, to_date))
+
+    def iter_employees_report_data(self, from_date: date, to_date: date) -> Iterator[EmployeeReportDTO]:
+        from_date, to_date = self._day(from_date), self._day(to_date)
+        roles = ['Официант', 'Курьер']
+
+        employees = User.objects.filter(role__name__in=roles).select_related('role').order_by('id')
+
+        stats = EmployeeDay.objects.filter(
+            employee__role__name__in=roles,
+            date__range=(from_date, to_date)
+        ).order_by('employee_id', 'date').values_list('employee_id', 'date', 'orders', 'revenue')
+
+        shifts = User.shifts.through.objects.filter(
+            user__role__name__in=roles,
+            shift__date__range=(from_date, to_date)
+        ).order_by('user_id', 'shift__date').values_list('user_id', 'shift__date')
+
+        for employee, employee_stats, employee_shifts in self._merge_by_employee(
+            employees.iterator(REPORT_ROWS_CHUNK_SIZE),
+            stats.iterator(REPORT_ROWS_CHUNK_SIZE),
+            shifts.iterator(REPORT_ROWS_CHUNK_SIZE)
+        ):
+            days = {day: (orders, revenue) for _, day, orders, revenue in employee_stats}
+            shift_days = sorted({day for _, day in employee_shifts})
+
+            yield EmployeeReportDTO(
+                employee.first_name,
+                employee.last_name,
+                employee.role.name,
+                sum(orders for orders, _ in days.values()),
+                sum(revenue for _, revenue in days.values()),
+                len(shift_days),
+                [EmployeeDayDTO(day, *days.get(day, (0, 0))) for day in shift_days]
+            )
+
+    def _merge_by_employee(self, employees: Iterable[User], *streams: Iterable[tuple]):
+        groups = [groupby(stream, key=itemgetter(0)) for stream in streams]
+        heads = [next(group, None) for group in groups]
 
         for employee in employees:
-            story.append(Paragraph(f"{employee.last_name} {employee.first_name}", heading2))
-            story.append(Paragraph(f"Должность: {employee.role.name}", normal))
-
-            total_orders = Order.objects.filter(
-                date__range=(from_date, to_date),
-                **(
-                    {'waiter': employee} if employee.role.name == 'Официант' else
-                    {'courier': employee} if employee.role.name == 'Курьер' else
-                    {}
-                )
-            ).count()
-            total_revenue = Order.objects.filter(
-                date__range=(from_date, to_date),
-                **(
-                    {'waiter': employee} if employee.role.name == 'Официант' else
-                    {'courier': employee} if employee.role.name == 'Курьер' else
-                    {}
-                )
-            ).aggregate(total=Sum('total'))['total'] or 0
-            total_shifts = employee.shifts.filter(date__range=(from_date, to_date)).count()
-
-            story.append(Paragraph(f"Обслужил заказов: {total_orders}", normal))
-            story.append(Paragraph(f"Выручка с заказов: {total_revenue} р.", normal))
-            story.append(Paragraph(f"Выходов на смену: {total_shifts}", normal))
-
-
-            story.append(Paragraph("Статистика по дням:", heading2))
-            table_data = [['Дата', 'Заказов', 'Выручка']]
-            current_date = from_date
-            while current_date <= to_date:
-                if employee.shifts.filter(date=current_date).exists():
-                    daily_orders = Order.objects.filter(
-                        date__date=current_date,
-                        **(
-                            {'waiter': employee} if employee.role.name == 'Официант' else
-                            {'courier': employee} if employee.role.name == 'Курьер' else
-                            {}
-                        )
-                    ).count()
-                    daily_revenue = Order.objects.filter(
-                        date__date=current_date,
-                        **(
-                            {'waiter': employee} if employee.role.name == 'Официант' else
-                            {'courier': employee} if employee.role.name == 'Курьер' else
-                            {}
-                        )
-                    ).aggregate(total=Sum('total'))['total'] or 0
-                    table_data.append(
-                        [
-                            f'{current_date.day:02d}.{current_date.month:02d}.{current_date.year}',
-                            daily_orders,
-                            f"{daily_revenue} р."
-                        ]
-                    )
-                current_date += timedelta(days=1)
-
-            table = Table(table_data)
-            table.setStyle(table_style)
-            story.append(table)
-            story.append(Spacer(1, 0.5 * inch))
-
-        doc.build(story)
-        return buffer
+            rows = []
+
+            for index, group in enumerate(groups):
+                while heads[index] is not None and heads[index][0] < employee.id:
+                    heads[index] = next(group, None)
+
+                if heads[index] is not None and heads[index][0] == employee.id:
+                    rows.append(list(heads[index][1]))
+                    heads[index] = next(group, None)
+                else:
+                    rows.append([])
+
+            yield employee, *rows
+
+    def generate_employees_report(self, from_date: date, to_date: date, buffer: BinaryIO = None, processes: int = None) -> BinaryIO:
+        processes = settings.REPORT_RENDER_PROCESSES if processes is None else processes
+
+        if can_render_in_parallel(processes):
+            return render_in_parallel(
+                _employees_story,
+                self._employees_tasks(from_date, to_date),
+                processes,
+                buffer
+            )
+
+        return build_pdf(_employees_story(from_date, to_date, self.iter_employees_report_data(from_date, to_date)), buffer)
+
+    def _employees_tasks(self, from_date: date, to_date: date):
+        employees = self.iter_employees_report_data(from_date, to_date)
+
+        yield from_date, to_date, list(islice(employees, REPORT_SECTIONS_PER_TASK))
+
+        while batch := list(islice(employees, REPORT_SECTIONS_PER_TASK)):
+            yield None, None, batch
+
+    def _employee_section(self, employee: EmployeeReportDTO):
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer, Table
+
+        styles = report_styles()
+
+        yield Paragraph(f"{employee.last_name} {employee.first_name}", styles.heading2)
+        yield Paragraph(f"Должность: {employee.role}", styles.normal)
+
+        yield Paragraph(f"Обслужил заказов: {employee.orders}", styles.normal)
+        yield Paragraph(f"Выручка с заказов: {employee.revenue} р.", styles.normal)
+        yield Paragraph(f"Выходов на смену: {employee.shifts}", styles.normal)
+
+        yield Paragraph("Статистика по дням:", styles.heading2)
+
+        days = iter(employee.days)
+        chunk = list(islice(days, REPORT_TABLE_ROWS))
+
+        while True:
+            table = Table(
+                [['Дата', 'Заказов', 'Выручка']] + [
+                    [f'{day.date.day:02d}.{day.date.month:02d}.{day.date.year}', day.orders, f"{day.revenue} р."]
+                    for day in chunk
+                ],
+                repeatRows=1
+            )
+            table.setStyle(styles.table)
+            yield table
+
+            chunk = list(islice(days, REPORT_TABLE_ROWS))
+
+            if not chunk:
+                break
+
+        yield Spacer(1, 0.5 * inch)
+
+
+def _employees_story(from_date: date | None, to_date: date | None, employees: Iterable[EmployeeReportDTO]):
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, Spacer
+
+    if from_date is not None:
+        yield Paragraph(
+            f"Отчет по сотрудникам с {from_date.day:02d}.{from_date.month:02d}.{from_date.year} по {to_date.day:02d}.{to_date.month:02d}.{to_date.year}",
+            report_styles().heading1
+        )
+        yield Spacer(1, 0.25 * inch)
+
+    for employee in employees:
+        yield from ReportService()._employee_section(employee)
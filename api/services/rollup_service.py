@@ -0,0 +1,114 @@
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import transaction, IntegrityError, models
+from django.db.models import F, Sum, Count
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from api.models import Order, OrderProduct, ProductSalesDay, EmployeeDay
+
+
+def business_day(moment: datetime) -> date:
+    if timezone.is_aware(moment):
+        return timezone.localdate(moment)
+
+    return moment.date()
+
+
+class RollupService:
+    def record_order(self, order: Order, positions: list[tuple[int, int, Decimal]], sign: int = 1):
+        day = business_day(order.date)
+
+        quantities = defaultdict(int)
+        revenues = defaultdict(Decimal)
+
+        for product_id, count, price in positions:
+            quantities[product_id] += count
+            revenues[product_id] += price * count
+
+        for product_id in quantities:
+            self._increment(
+                ProductSalesDay,
+                {'date': day, 'product_id': product_id},
+                quantity=sign * quantities[product_id],
+                revenue=sign * revenues[product_id]
+            )
+
+        for employee_id in {order.waiter_id, order.courier_id} - {None}:
+            self._record_employee(order, employee_id, sign)
+
+    def record_courier(self, order: Order):
+        if order.status != 'Отменён' and order.courier_id is not None:
+            self._record_employee(order, order.courier_id, 1)
+
+    def record_cancellation(self, order: Order):
+        self.record_order(
+            order,
+            list(
+                OrderProduct.objects.filter(order=order).values_list(
+                    'product_id', 'count', Coalesce('price', 'product__price')
+                )
+            ),
+            sign=-1
+        )
+
+    def rebuild(self):
+        with transaction.atomic():
+            ProductSalesDay.objects.all().delete()
+
+            ProductSalesDay.objects.bulk_create(
+                [
+                    ProductSalesDay(product_id=row['product_id'], date=row['day'], quantity=row['quantity'], revenue=row['revenue'])
+                    for row in OrderProduct.objects.exclude(order__status='Отменён').annotate(
+                        day=TruncDate('order__date')
+                    ).values('day', 'product_id').annotate(
+                        quantity=Sum('count'),
+                        revenue=Sum(
+                            F('count') * Coalesce('price', 'product__price'),
+                            output_field=models.DecimalField(max_digits=13, decimal_places=2)
+                        )
+                    )
+                ],
+                batch_size=1000
+            )
+
+            EmployeeDay.objects.all().delete()
+
+            stats = defaultdict(lambda: [0, Decimal(0)])
+
+            for field in ('waiter_id', 'courier_id'):
+                for row in Order.objects.exclude(status='Отменён').exclude(**{field: None}).annotate(
+                    day=TruncDate('date')
+                ).values('day', field).annotate(orders=Count('id'), revenue=Sum('total')):
+                    stats[(row[field], row['day'])][0] += row['orders']
+                    stats[(row[field], row['day'])][1] += row['revenue']
+
+            EmployeeDay.objects.bulk_create(
+                [
+                    EmployeeDay(employee_id=employee_id, date=day, orders=orders, revenue=revenue)
+                    for (employee_id, day), (orders, revenue) in stats.items()
+                ],
+                batch_size=1000
+            )
+
+    def _record_employee(self, order: Order, employee_id: int, sign: int):
+        self._increment(
+            EmployeeDay,
+            {'date': business_day(order.date), 'employee_id': employee_id},
+            orders=sign,
+            revenue=sign * order.total
+        )
+
+    def _increment(self, model, key: dict, **deltas):
+        increments = {field: F(field) + delta for field, delta in deltas.items()} | {'updated_at': timezone.now()}
+
+        if model.objects.filter(**key).update(**increments):
+            return
+
+        try:
+            with transaction.atomic():
+                model.objects.create(**key, **deltas)
+        except IntegrityError:
+            model.objects.filter(**key).update(**increments)
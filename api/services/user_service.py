@@ -14,6 +14,8 @@ class UserService:
             {
                 'id': user.id,
                 'role_id': user.role_id,
+                'role': user.role.name if user.role else None,
+                'ver': user.token_version,
                 'exp': datetime.datetime.now() + datetime.timedelta(days=30)
             },
             key=settings.SECRET_KEY
@@ -0,0 +1,97 @@
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from api.auth import principal_cache, token_versions
+from api.availability import availability
+from api.invalidation import invalidation, PRODUCTS, INGREDIENTS, TABLES, SHIFTS, PROMOS, USERS, EMPLOYEES, ROLES
+from api.snapshot import menu_snapshot
+from api.models import User, Role, Product, ProductIngredient, Ingredient, Table, Shift, Promo
+
+
+invalidation.subscribe(USERS, principal_cache.clear)
+invalidation.subscribe(USERS, token_versions.clear)
+invalidation.subscribe(TABLES, availability.clear)
+
+for namespace in (PRODUCTS, INGREDIENTS, PROMOS):
+    invalidation.subscribe(namespace, menu_snapshot.schedule, local=True)
+
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_role_change(sender, instance: User, **kwargs):
+    if instance.pk is not None and getattr(instance, '_loaded_role_id', instance.role_id) != instance.role_id:
+        instance.token_version += 1
+
+
+@receiver(post_save, sender=User)
+def invalidate_principal(sender, instance: User, **kwargs):
+    instance._loaded_role_id = instance.role_id
+
+    principal_cache.invalidate(instance.id)
+    token_versions.set(instance.id, instance.token_version)
+
+    if kwargs.get('update_fields') != frozenset({'last_login'}):
+        invalidation.bump(USERS, EMPLOYEES)
+
+
+@receiver(post_delete, sender=User)
+def forget_principal(sender, instance: User, **kwargs):
+    principal_cache.invalidate(instance.id)
+    token_versions.set(instance.id, None)
+    invalidation.bump(USERS, EMPLOYEES)
+
+
+@receiver(pre_save, sender=Role)
+def revoke_tokens_on_role_rename(sender, instance: Role, **kwargs):
+    if instance.pk is not None and getattr(instance, '_loaded_name', instance.name) != instance.name:
+        User.objects.filter(role_id=instance.pk).update(token_version=F('token_version') + 1)
+
+
+@receiver(pre_delete, sender=Role)
+def revoke_tokens_on_role_delete(sender, instance: Role, **kwargs):
+    User.objects.filter(role_id=instance.pk).update(token_version=F('token_version') + 1)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_principals(sender, instance: Role, **kwargs):
+    instance._loaded_name = instance.name
+
+    principal_cache.clear()
+    token_versions.clear()
+    invalidation.bump(USERS, ROLES)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductIngredient)
+@receiver(post_delete, sender=ProductIngredient)
+def invalidate_products(sender, **kwargs):
+    invalidation.bump(PRODUCTS)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    invalidation.bump(INGREDIENTS)
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def invalidate_tables(sender, **kwargs):
+    if kwargs.get('update_fields') != frozenset({'client'}):
+        invalidation.bump(TABLES)
+
+
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+@receiver(m2m_changed, sender=User.shifts.through)
+def invalidate_shifts(sender, action: str = 'post_save', **kwargs):
+    if action.startswith('post_'):
+        invalidation.bump(SHIFTS)
+
+
+@receiver(post_save, sender=Promo)
+@receiver(post_delete, sender=Promo)
+def invalidate_promos(sender, **kwargs):
+    invalidation.bump(PROMOS)
@@ -0,0 +1,195 @@
+import contextlib
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.db import connection
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+
+from api.dto import PromoDTO
+from api.invalidation import invalidation, PRODUCTS, INGREDIENTS, PROMOS
+from api.services.product_service import ProductService
+from api.services.promo_service import PromoService
+from api.utils import jsonify, is_not_modified, conditional_stats
+from cursed import settings
+
+
+__all__ = ['MenuSnapshot', 'menu_snapshot', 'snapshot_response', 'FEEDS']
+
+
+FEEDS = ('menu', 'promos')
+NAMESPACES = (PRODUCTS, INGREDIENTS, PROMOS)
+PUBLISH_ATTEMPTS = 3
+
+
+class MenuSnapshot:
+    def __init__(self, root: Path, delay: float, keep: int):
+        self.root = Path(root)
+        self.delay = delay
+        self.keep = keep
+
+        self._files: dict[str, tuple[tuple[int, int], str, bytes, list[int] | None]] = {}
+        self._timer: threading.Timer | None = None
+        self._published_at = 0.0
+        self._paused = 0
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+
+    def read(self, feed: str) -> tuple[str, bytes]:
+        path = self.root / f'{feed}.json'
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.publish()
+            stat = os.stat(path)
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._files.get(feed)
+
+        if cached is None or cached[0] != signature:
+            content = path.read_bytes()
+            digest = self._digest(content)
+            cached = self._files[feed] = (signature, f'"{digest}"', content, self._published_versions(feed, digest))
+
+        versions = [invalidation.version(namespace) for namespace in NAMESPACES]
+
+        if self._behind(cached[3], versions):
+            cached = self._files[feed] = (*cached[:3], self._published_versions(feed, cached[1].strip('"')))
+
+        if self._behind(cached[3], versions) or feed == 'menu' and time.monotonic() - self._published_at >= settings.MENU_STOCK_TTL:
+            self.schedule()
+
+        return cached[1], cached[2]
+
+    @contextlib.contextmanager
+    def paused(self):
+        with self._lock:
+            self._paused += 1
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._paused -= 1
+
+    def schedule(self):
+        with self._lock:
+            if self._timer is not None or self._paused:
+                return
+
+            self._timer = threading.Timer(self.delay, self._run)
+            self._timer.start()
+
+    def publish(self) -> dict[str, Path]:
+        with self._publish_lock:
+            invalidation.poll(force=True)
+
+            for _ in range(PUBLISH_ATTEMPTS):
+                self._published_at = time.monotonic()
+                versions = [invalidation.version(namespace) for namespace in NAMESPACES]
+                generation = f'{sum(versions):010d}.{time.time_ns():020d}.{"_".join(map(str, versions))}'
+
+                feeds = {
+                    'menu': jsonify(ProductService().get_menu()).encode(),
+                    'promos': jsonify([PromoDTO.from_model(promo) for promo in PromoService().get_all()]).encode()
+                }
+
+                invalidation.poll(force=True)
+                if versions == [invalidation.version(namespace) for namespace in NAMESPACES]:
+                    break
+
+            self.root.mkdir(parents=True, exist_ok=True)
+
+            published = {}
+            for feed, content in feeds.items():
+                digest = self._digest(content)
+                newest = max(map(self._generation, self.root.glob(f'{feed}-*.json')), default='')
+                path = self.root / f'{feed}-{generation}-{digest}.json'
+
+                previous = next(self.root.glob(f'{feed}-*-{digest}.json'), None)
+                if previous is None:
+                    self._write(path, content)
+                elif self._generation(previous) < generation and self._versions(previous) != versions:
+                    os.replace(previous, path)
+                else:
+                    path = previous
+
+                if newest <= generation and self._published_digest(feed) != digest:
+                    self._write(self.root / f'{feed}.json', content)
+
+                published[feed] = path
+
+            self._evict()
+
+            return published
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+
+        try:
+            self.publish()
+        finally:
+            connection.close()
+
+    def _write(self, path: Path, content: bytes):
+        descriptor, temporary = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+
+        os.replace(temporary, path)
+
+    def _evict(self):
+        for feed in FEEDS:
+            versions = sorted(self.root.glob(f'{feed}-*.json'), key=self._generation, reverse=True)
+
+            for path in versions[self.keep:]:
+                path.unlink(missing_ok=True)
+
+    def _generation(self, path: Path) -> str:
+        parts = path.stem.split('-')
+
+        return parts[1] if len(parts) == 3 else ''
+
+    def _versions(self, path: Path) -> list[int] | None:
+        parts = self._generation(path).split('.')
+
+        return [int(version) for version in parts[2].split('_')] if len(parts) == 3 else None
+
+    def _behind(self, published: list[int] | None, versions: list[int]) -> bool:
+        return published is None or any(old < new for old, new in zip(published, versions))
+
+    def _published_versions(self, feed: str, digest: str) -> list[int] | None:
+        published = next(self.root.glob(f'{feed}-*-{digest}.json'), None)
+
+        return self._versions(published) if published is not None else None
+
+    def _published_digest(self, feed: str) -> str | None:
+        try:
+            return self._digest((self.root / f'{feed}.json').read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def _digest(self, content: bytes) -> str:
+        return hashlib.blake2b(content, digest_size=12).hexdigest()
+
+
+def snapshot_response(request: HttpRequest, feed: str, endpoint: str) -> HttpResponse:
+    etag, content = menu_snapshot.read(feed)
+
+    not_modified = is_not_modified(request, etag, None)
+    conditional_stats.record(endpoint, not_modified)
+
+    response = HttpResponseNotModified() if not_modified else HttpResponse(content, content_type='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Access-Control-Expose-Headers'] = 'ETag'
+
+    return response
+
+
+menu_snapshot = MenuSnapshot(settings.MEDIA_ROOT / 'menu', settings.MENU_SNAPSHOT_DELAY, settings.MENU_SNAPSHOT_KEEP)
@@ -1,3 +1,768 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.db import connection, OperationalError
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.broadcast import Broadcaster, get_broadcaster, set_broadcaster
+from api.dto import OrderDTO
+from api.auth import principal_cache, token_versions
+from api.availability import availability
+from api.invalidation import invalidation, TABLES, PROMOS, USERS
+from api.menu import ServingsMatrix, vectorized
+from api.models import Role, User, Product, Ingredient, ProductIngredient, Order, Shift, EmployeeDay, ReportJob, StockMovement, Table, TableBooking
+from api.report_cache import report_cache
+from api.services.order_service import OrderService, StockShortageError
+from api.services.product_service import ProductService
+from api.services.report_job_service import ReportJobService
+from api.services.report_service import ReportService
+from api.services.user_service import UserService
+from api.snapshot import MenuSnapshot, menu_snapshot
+from cursed import settings
+
+
+WATCHER = '''
+import json
+import sys
+import time
+
+import django
+
+from cursed import settings
+
+settings.DATABASES['default']['NAME'] = sys.argv[1]
+django.setup()
+
+from api.menu import cookable_menu
+
+seen = None
+deadline = time.monotonic() + float(sys.argv[2])
+
+while time.monotonic() < deadline:
+    menu = [[item.name, item.servings] for item in cookable_menu.items()]
+
+    if menu != seen:
+        print(json.dumps(menu, ensure_ascii=False), flush=True)
+        seen = menu
+
+    time.sleep(0.01)
+'''
+
+
+def run_concurrently(target, threads: int) -> list:
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+
+    def worker(index: int):
+        try:
+            barrier.wait()
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return results
+
+
+class ApiTestCase(TransactionTestCase):
+    def setUp(self):
+        self.enterContext(menu_snapshot.paused())
+
+
+class StockReservationTests(ApiTestCase):
+    THREADS = 8
+
+    def setUp(self):
+        super().setUp()
+
+        role = Role.objects.get_or_create(name='Клиент')[0]
+        self.client_user = User.objects.create_user(username='client', password='x', role=role, phone_number='1')
+
+        self.ingredient = Ingredient.objects.create(name='Мука', count=1)
+        self.product = Product.objects.create(name='Пирог', price=5)
+        ProductIngredient.objects.create(product=self.product, ingredient=self.ingredient, count=1)
+
+    def order(self):
+        product = Product.objects.get(id=self.product.id)
+
+        return OrderService().create_order(self.client_user, None, 'ул. Тестовая, 1', [(product, 1)])
+
+    def balance(self) -> int:
+        return Ingredient.objects.get(id=self.ingredient.id).count
+
+    def test_concurrent_orders_cannot_take_the_last_stock_twice(self):
+        results = run_concurrently(self.order, self.THREADS)
+
+        created = [result for result in results if isinstance(result, Order)]
+        rejected = [result for result in results if isinstance(result, (StockShortageError, OperationalError))]
+
+        self.assertEqual(len(created) + len(rejected), self.THREADS, results)
+        self.assertLessEqual(len(created), 1)
+        self.assertEqual(Order.objects.count(), len(created))
+        self.assertEqual(self.balance(), 1 - len(created))
+
+    def test_shortage_leaves_stock_untouched(self):
+        self.order()
+
+        with self.assertRaises(StockShortageError) as raised:
+            self.order()
+
+        self.assertEqual(raised.exception.shortages[0]['available'], 0)
+        self.assertEqual(self.balance(), 0)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_adjustment_cannot_take_stock_below_zero(self):
+        ProductService().adjust_ingredient(self.ingredient.id, 2)
+
+        with self.assertRaises(ValueError):
+            ProductService().adjust_ingredient(self.ingredient.id, -4)
+
+        self.assertEqual(self.balance(), 3)
+        self.assertEqual(
+            StockMovement.objects.filter(kind=StockMovement.ADJUSTMENT).count(), 1 if settings.STOCK_LEDGER else 0
+        )
+
+
+class StockLedgerReservationTests(StockReservationTests):
+    def setUp(self):
+        ledger = mock.patch.object(settings, 'STOCK_LEDGER', True)
+        ledger.start()
+        self.addCleanup(ledger.stop)
+
+        super().setUp()
+
+    def balance(self) -> int:
+        return next(
+            ingredient.count for ingredient in ProductService().get_all_ingredients() if ingredient.id == self.ingredient.id
+        )
+
+
+class EmployeesReportQueryTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.admin = User.objects.create_user(
+            username='report_admin', password='x', role=Role.objects.get_or_create(name='Админ')[0]
+        )
+        self.waiter_role = Role.objects.get_or_create(name='Официант')[0]
+
+        cache = mock.patch.object(report_cache, 'root', Path(tempfile.mkdtemp()))
+        cache.start()
+        self.addCleanup(cache.stop)
+
+    def staff(self, employees: int, first_day: date, days: int):
+        for index in range(employees):
+            employee = User.objects.create_user(
+                username=f'waiter{first_day}{index}', password='x', role=self.waiter_role, first_name=f'Имя {index}'
+            )
+
+            for offset in range(days):
+                day = first_day + timedelta(days=offset)
+                employee.shifts.add(Shift.objects.create(date=day))
+                EmployeeDay.objects.create(employee=employee, date=day, orders=offset + 1, revenue=Decimal(offset * 10))
+
+    def report_queries(self, first_day: date, days: int) -> int:
+        last_day = first_day + timedelta(days=days - 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/report/employees',
+                {'from_date': first_day.strftime('%d.%m.%Y'), 'to_date': last_day.strftime('%d.%m.%Y')},
+                HTTP_AUTHORIZATION=f'Bearer {UserService().generate_jwt(self.admin)}'
+            )
+            b''.join(response.streaming_content)
+
+        self.assertEqual(response.status_code, 200)
+
+        return len(queries)
+
+    def test_report_data_takes_three_queries(self):
+        first_day = date.today() - timedelta(days=60)
+        self.staff(8, first_day, 30)
+
+        with self.assertNumQueries(3):
+            report = ReportService().get_employees_report_data(first_day, first_day + timedelta(days=29))
+
+        self.assertEqual(len(report), 8)
+        self.assertEqual(sum(len(employee.days) for employee in report), 8 * 30)
+
+    def test_endpoint_query_count_does_not_depend_on_staff_or_range(self):
+        small = date.today() - timedelta(days=200)
+        large = date.today() - timedelta(days=100)
+
+        self.staff(2, small, 3)
+        self.staff(12, large, 45)
+        self.report_queries(small, 3)
+
+        self.assertEqual(self.report_queries(small + timedelta(days=1), 2), self.report_queries(large, 45))
+
+
+class InvalidationAcrossProcessesTests(ApiTestCase):
+    INTERVAL = 0.2
+    SLACK = 1.5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.memory = (connection.settings_dict['NAME'], connection.connection)
+        connection.connection = None
+        connection.settings_dict['NAME'] = str(Path(tempfile.mkdtemp()) / 'shared.sqlite3')
+
+        call_command('migrate', verbosity=0, interactive=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        connection.close()
+        connection.settings_dict['NAME'], connection.connection = cls.memory
+
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+
+        role = Role.objects.get_or_create(name='Клиент')[0]
+        self.client_user = User.objects.create_user(username='client', password='x', role=role, phone_number='1')
+
+        ingredient = Ingredient.objects.create(name='Мука', count=2)
+        self.product = Product.objects.create(name='Пирог', price=5)
+        ProductIngredient.objects.create(product=self.product, ingredient=ingredient, count=1)
+
+        self.watcher = subprocess.Popen(
+            [sys.executable, '-c', WATCHER, str(connection.settings_dict['NAME']), '30'],
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            env=os.environ | {'INVALIDATION_INTERVAL': str(self.INTERVAL), 'MENU_STOCK_TTL': str(self.INTERVAL)}
+        )
+        self.addCleanup(self.watcher.wait)
+        self.addCleanup(self.watcher.kill)
+
+        self.assertEqual(self.watched_menu(), [['Пирог', 2]])
+
+    def watched_menu(self) -> list:
+        line = self.watcher.stdout.readline()
+        self.assertTrue(line, 'watcher exited')
+
+        return json.loads(line)
+
+    def assertSeenWithin(self, menu: list, started: float):
+        self.assertEqual(self.watched_menu(), menu)
+        self.assertLess(time.monotonic() - started, self.INTERVAL + self.SLACK)
+
+    def test_other_process_sees_product_change(self):
+        started = time.monotonic()
+        self.product.name = 'Пирожок'
+        self.product.save()
+
+        self.assertSeenWithin([['Пирожок', 2]], started)
+
+    def test_other_process_sees_stock_taken_by_order(self):
+        started = time.monotonic()
+        OrderService().create_order(self.client_user, None, 'ул. Тестовая, 1', [(self.product, 1)])
+
+        self.assertSeenWithin([['Пирог', 1]], started)
+
+
+class ReportJobExpiryTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+
+        executor = mock.patch('api.services.report_job_service._get_executor')
+        self.executor = executor.start().return_value
+        self.addCleanup(executor.stop)
+
+    def submit(self) -> ReportJob:
+        return ReportJobService().submit(ReportJob.PRODUCT_SALES, date(2024, 1, 1), date(2024, 1, 31))
+
+    def age(self, job: ReportJob, seconds: int, **fields):
+        ReportJob.objects.filter(id=job.id).update(created_at=timezone.now() - timedelta(seconds=seconds), **fields)
+
+    def test_queued_job_is_reused(self):
+        job = self.submit()
+        self.age(job, settings.REPORT_QUEUE_TIMEOUT - 60)
+
+        self.assertEqual(self.submit().id, job.id)
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+    def test_orphaned_pending_job_is_failed_and_replaced(self):
+        orphan = self.submit()
+        self.age(orphan, settings.REPORT_QUEUE_TIMEOUT + 1)
+
+        job = self.submit()
+        orphan.refresh_from_db()
+
+        self.assertNotEqual(job.id, orphan.id)
+        self.assertEqual(job.status, ReportJob.PENDING)
+        self.assertEqual(orphan.status, ReportJob.FAILED)
+        self.assertEqual(self.executor.submit.call_count, 2)
+
+    def test_orphaned_running_job_is_failed(self):
+        orphan = self.submit()
+        self.age(
+            orphan,
+            settings.REPORT_JOB_TIMEOUT + 1,
+            status=ReportJob.RUNNING,
+            started_at=timezone.now() - timedelta(seconds=settings.REPORT_JOB_TIMEOUT + 1)
+        )
+
+        ReportJobService().expire()
+        orphan.refresh_from_db()
+
+        self.assertEqual(orphan.status, ReportJob.FAILED)
+
+    def test_failed_job_is_not_started_late(self):
+        orphan = self.submit()
+        self.age(orphan, settings.REPORT_QUEUE_TIMEOUT + 1)
+        ReportJobService().expire()
+
+        with mock.patch.object(ReportService, 'get_cached_report') as render:
+            ReportJobService()._run(orphan.id)
+
+        orphan.refresh_from_db()
+
+        render.assert_not_called()
+        self.assertEqual(orphan.status, ReportJob.FAILED)
+
+
+class TablesLoadTests(ApiTestCase):
+    def test_seated_tables_are_listed_and_counted_in_load(self):
+        hall = User.objects.create_user(
+            username='hall', password='x', role=Role.objects.get_or_create(name='Работник зала')[0]
+        )
+        client = User.objects.create_user(
+            username='client', password='x', role=Role.objects.get_or_create(name='Клиент')[0], phone_number='1'
+        )
+
+        Table.objects.create(client=client)
+        Table.objects.create()
+
+        response = self.client.get('/tables', HTTP_AUTHORIZATION=f'Bearer {UserService().generate_jwt(hall)}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['tables']), 2)
+        self.assertEqual(response.json()['load'], 0.5)
+
+
+class KitchenStreamTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.cook = User.objects.create_user(
+            username='cook', password='x', role=Role.objects.get_or_create(name='Работник кухни')[0]
+        )
+        self.customer = User.objects.create_user(
+            username='client', password='x', role=Role.objects.get_or_create(name='Клиент')[0], phone_number='1'
+        )
+        self.order = self.place_order()
+
+        self.broadcaster = Broadcaster(max_pending=1)
+        previous = get_broadcaster()
+        set_broadcaster(self.broadcaster)
+        self.addCleanup(set_broadcaster, previous)
+
+    def place_order(self) -> Order:
+        return Order.objects.create(
+            kind=Order.DELIVERY, status='Принят', date=timezone.now(), client=self.customer, address='ул. Тестовая, 1'
+        )
+
+    @contextlib.asynccontextmanager
+    async def open_stream(self):
+        response = await AsyncClient().get(
+            '/orders/active/stream', headers={'Authorization': f'Bearer {UserService().generate_jwt(self.cook)}'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        stream = aiter(response.streaming_content)
+
+        try:
+            yield stream
+        finally:
+            await stream.aclose()
+
+    async def next_event(self, stream) -> tuple[str, object]:
+        while True:
+            chunk = (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+
+            if not chunk.startswith(':'):
+                kind, data = chunk.strip().split('\n')
+                return kind.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+    def event(self, order: Order) -> OrderDTO:
+        return OrderDTO(order.id, order.date, order.address, order.table_id, order.status, [])
+
+    async def test_snapshot_then_published_order(self):
+        async with self.open_stream() as stream:
+            kind, orders = await self.next_event(stream)
+            self.assertEqual((kind, [order['id'] for order in orders]), ('snapshot', [self.order.id]))
+
+            order = await sync_to_async(self.place_order)()
+            self.broadcaster.publish(self.event(order))
+
+            kind, published = await self.next_event(stream)
+            self.assertEqual((kind, published['id']), ('order', order.id))
+
+    async def test_overflow_sends_a_new_snapshot(self):
+        async with self.open_stream() as stream:
+            await self.next_event(stream)
+
+            orders = [await sync_to_async(self.place_order)() for _ in range(3)]
+            for order in orders:
+                self.broadcaster.publish(self.event(order))
+
+            kind, snapshot = await self.next_event(stream)
+            while kind == 'order':
+                kind, snapshot = await self.next_event(stream)
+
+            self.assertEqual(kind, 'snapshot')
+            self.assertEqual(len(snapshot), 4)
+
+    async def test_orders_from_other_workers_send_a_new_snapshot(self):
+        with mock.patch('api.endpoints.order.KITCHEN_HEARTBEAT', 0.1):
+            async with self.open_stream() as stream:
+                await self.next_event(stream)
+
+                await sync_to_async(self.place_order)()
+
+                kind, snapshot = await self.next_event(stream)
+
+        self.assertEqual(kind, 'snapshot')
+        self.assertEqual(len(snapshot), 2)
+
+
+class BookingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+
+        role = Role.objects.get_or_create(name='Клиент')[0]
+        self.first, self.second = (
+            User.objects.create_user(username=f'client{index}', password='x', role=role, phone_number=f'{index}')
+            for index in range(2)
+        )
+        self.table = Table.objects.create()
+        self.time = timezone.now() + timedelta(days=3)
+        self.day = self.time.date()
+
+        availability.clear()
+        self.addCleanup(availability.clear)
+
+    def test_booking_cancelled_by_another_worker_can_be_taken(self):
+        OrderService().book_table(self.first, self.time, self.table)
+        self.assertTrue(availability.is_booked(self.day, self.table.id))
+
+        TableBooking.objects.filter(table=self.table).delete()
+        Order.objects.filter(client=self.first).update(status='Отменён')
+
+        OrderService().book_table(self.second, self.time, self.table)
+
+        self.assertEqual(TableBooking.objects.get(table=self.table).order.client_id, self.second.id)
+
+    def test_taken_table_is_refused(self):
+        OrderService().book_table(self.first, self.time, self.table)
+
+        with self.assertRaises(ValueError):
+            OrderService().book_table(self.second, self.time, self.table)
+
+    def test_cancellation_bumps_tables(self):
+        OrderService().book_table(self.first, self.time, self.table)
+        version = invalidation.version(TABLES)
+
+        OrderService().cancel_order(Order.objects.get(client=self.first))
+        invalidation.poll(force=True)
+
+        self.assertGreater(invalidation.version(TABLES), version)
+        self.assertFalse(availability.is_booked(self.day, self.table.id))
+
+
+class MenuSnapshotTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.root = Path(tempfile.mkdtemp())
+        self.snapshot = MenuSnapshot(self.root, 60, 3)
+
+        Product.objects.create(name='Пирог', price=5)
+        self.snapshot.publish()
+
+    def files(self) -> dict[str, int]:
+        return {path.name: path.stat().st_mtime_ns for path in self.root.iterdir()}
+
+    def test_unchanged_publish_writes_nothing(self):
+        files = self.files()
+
+        self.snapshot.publish()
+
+        self.assertEqual(self.files(), files)
+
+    def test_changed_menu_is_published(self):
+        menu = (self.root / 'menu.json').read_bytes()
+
+        Product.objects.create(name='Пирожок', price=3)
+        self.snapshot.publish()
+
+        self.assertNotEqual((self.root / 'menu.json').read_bytes(), menu)
+        self.assertEqual(len(list(self.root.glob('menu-*.json'))), 2)
+
+    def test_read_schedules_a_publish_once_versions_move(self):
+        with mock.patch.object(self.snapshot, 'schedule') as schedule:
+            self.snapshot.read('promos')
+            schedule.assert_not_called()
+
+            invalidation.bump(PROMOS)
+            self.snapshot.read('promos')
+            schedule.assert_called_once()
+
+            self.snapshot.publish()
+            schedule.reset_mock()
+            self.snapshot.read('promos')
+            schedule.assert_not_called()
+
+
+class TokenRevocationTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+
+        claims = mock.patch.object(settings, 'JWT_CLAIMS_AUTH', True)
+        claims.start()
+        self.addCleanup(claims.stop)
+
+        principal_cache.clear()
+        token_versions.clear()
+
+        self.role = Role.objects.get_or_create(name='Админ')[0]
+        self.admin = User.objects.create_user(username='revoked_admin', password='x', role=self.role)
+        self.token = UserService().generate_jwt(self.admin)
+
+    def stats(self, token: str | None = None) -> int:
+        return self.client.get(
+            '/stats/conditional', HTTP_AUTHORIZATION=f'Bearer {token or self.token}'
+        ).status_code
+
+    def test_role_change_revokes_token(self):
+        self.assertEqual(self.stats(), 200)
+
+        self.admin.role = Role.objects.get_or_create(name='Клиент')[0]
+        self.admin.save()
+
+        self.assertEqual(self.stats(), 403)
+        self.assertEqual(self.stats(UserService().generate_jwt(self.admin)), 403)
+
+    def test_role_rename_revokes_token(self):
+        self.assertEqual(self.stats(), 200)
+
+        role = Role.objects.get(id=self.role.id)
+        role.name = 'Бывший админ'
+        role.save()
+
+        self.assertEqual(self.stats(), 403)
+
+    def test_role_delete_revokes_token(self):
+        self.assertEqual(self.stats(), 200)
+
+        Role.objects.get(id=self.role.id).delete()
+
+        self.assertEqual(self.stats(), 403)
+        self.assertIsNone(User.objects.get(id=self.admin.id).role_id)
+
+    def test_deleted_user_is_refused(self):
+        self.assertEqual(self.stats(), 200)
+
+        User.objects.get(id=self.admin.id).delete()
+
+        self.assertEqual(self.stats(), 403)
+
+    def test_claims_skip_loading_the_user_until_it_is_used(self):
+        self.stats()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.stats(), 200)
+
+        self.assertFalse([query for query in queries if '"api_user"' in query['sql']])
+
+        response = self.client.get('/profile', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.admin.id)
+
+
+class ServingsMatrixTests(SimpleTestCase):
+    def brute_force(self, products: list[int], recipes: list[tuple[int, int, int]], stock: dict[int, int]) -> list:
+        servings = []
+
+        for product_id in products:
+            needs = [
+                (ingredient_id, count) for recipe_product, ingredient_id, count in recipes
+                if recipe_product == product_id and count > 0
+            ]
+            servings.append(
+                min(max(stock.get(ingredient_id, 0), 0) // count for ingredient_id, count in needs) if needs else None
+            )
+
+        return servings
+
+    def random_menu(self, seed: int) -> tuple[list[int], list[tuple[int, int, int]], dict[int, int]]:
+        rng = random.Random(seed)
+
+        products = list(range(1, 61))
+        ingredients = list(range(1, 41))
+        recipes = [
+            (product_id, ingredient_id, rng.randint(0, 5))
+            for product_id in products[:-5]
+            for ingredient_id in rng.sample(ingredients, rng.randint(1, 6))
+        ]
+        stock = {ingredient_id: rng.randint(-3, 60) for ingredient_id in ingredients}
+
+        return products, recipes, stock
+
+    def backends(self) -> list:
+        np = vectorized()
+        self.assertIsNotNone(np)
+
+        return [None, np]
+
+    def test_backends_match_brute_force(self):
+        for seed in range(20):
+            products, recipes, stock = self.random_menu(seed)
+            expected = self.brute_force(products, recipes, stock)
+
+            for np in self.backends():
+                with self.subTest(seed=seed, numpy=np is not None):
+                    self.assertEqual(ServingsMatrix(products, recipes, stock, np).get_servings(), expected)
+
+    def test_products_without_recipe_have_no_servings(self):
+        for np in self.backends():
+            matrix = ServingsMatrix([1, 2, 3], [(1, 1, 2), (3, 1, 0)], {1: 5}, np)
+
+            self.assertEqual(matrix.get_servings(), [2, None, None])
+
+    def test_incremental_update_matches_rebuild(self):
+        rng = random.Random(0)
+
+        for seed in range(10):
+            products, recipes, stock = self.random_menu(seed)
+
+            for np in self.backends():
+                matrix = ServingsMatrix(products, recipes, stock, np)
+                current = dict(stock)
+
+                for _ in range(5):
+                    for ingredient_id in rng.sample(sorted(current), 4):
+                        current[ingredient_id] = rng.randint(0, 60)
+
+                    before = matrix.get_servings()
+                    changed = matrix.update(current)
+                    after = matrix.get_servings()
+
+                    with self.subTest(seed=seed, numpy=np is not None):
+                        self.assertEqual(after, self.brute_force(products, recipes, current))
+                        self.assertGreaterEqual(changed, sum(old != new for old, new in zip(before, after)))
+
+                self.assertEqual(matrix.update(current), 0)
+
+
+class PrincipalInvalidationTests(ApiTestCase):
+    def test_user_edit_bumps_users_and_drops_cached_principals(self):
+        role = Role.objects.get_or_create(name='Клиент')[0]
+        user = User.objects.create_user(username='principal', password='x', role=role, phone_number='1')
+        other = User.objects.create_user(username='other', password='x', role=role, phone_number='2')
+
+        principal_cache.put(other.id, 'token', other)
+        version = invalidation.version(USERS)
+
+        user.first_name = 'Новое имя'
+        user.save()
+
+        self.assertGreater(invalidation.version(USERS), version)
+        self.assertIsNone(principal_cache.get(other.id, 'token'))
+
+    def test_login_does_not_bump_users(self):
+        user = User.objects.create_user(
+            username='principal', password='x', role=Role.objects.get_or_create(name='Клиент')[0], phone_number='1'
+        )
+        version = invalidation.version(USERS)
+
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+
+        self.assertEqual(invalidation.version(USERS), version)
+
+
+class ConditionalRequestTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.admin = User.objects.create_user(
+            username='etag_admin', password='x', role=Role.objects.get_or_create(name='Админ')[0]
+        )
+        self.waiter = User.objects.create_user(
+            username='etag_waiter', password='x', role=Role.objects.get_or_create(name='Официант')[0], first_name='Имя'
+        )
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {UserService().generate_jwt(self.admin)}'}
+
+    def get(self, path: str, etag: str | None = None):
+        headers = self.headers | ({'HTTP_IF_NONE_MATCH': etag} if etag else {})
+        response = self.client.get(path, **headers)
+
+        if response.status_code == 200:
+            b''.join(response.streaming_content)
+
+        return response
+
+    def test_repeated_request_is_not_modified_without_queries(self):
+        etag = self.get('/employees')['ETag']
+
+        with mock.patch.object(invalidation, 'interval', 3600), self.assertNumQueries(0):
+            response = self.get('/employees', etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_employee_edit_changes_etag(self):
+        etag = self.get('/employees')['ETag']
+
+        self.waiter.first_name = 'Другое имя'
+        self.waiter.save()
+
+        response = self.get('/employees', etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_stock_taken_by_order_changes_etag(self):
+        ingredient = Ingredient.objects.create(name='Мука', count=5)
+        product = Product.objects.create(name='Пирог', price=5)
+        ProductIngredient.objects.create(product=product, ingredient=ingredient, count=1)
+
+        etag = self.get('/ingredients')['ETag']
+        self.assertEqual(self.get('/ingredients', etag).status_code, 304)
+
+        OrderService().create_order(self.waiter, None, 'ул. Тестовая, 1', [(product, 1)])
+
+        response = self.get('/ingredients', etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
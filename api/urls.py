@@ -10,6 +10,7 @@ urls = [
     path('profile', profile, name='profile'),
 
     path('tables/available', get_available_tables_by_date, name='get_available_tables_by_date'),
+    path('tables/availability', get_tables_availability, name='get_tables_availability'),
     path('tables', get_tables, name='get_tables'),
 
     path('promos', get_promos, name='get_promos'),
@@ -25,6 +26,7 @@ urls = [
 
     path('ingredients', get_all_ingredients, name='get_all_ingredients'),
     path('ingredients/replenish', replenish_ingredients, name='replenish_ingredients'),
+    path('ingredients/<int:ingredient_id>/adjust', adjust_ingredient, name='adjust_ingredient'),
 
     path('book', book_table, name='book_table'),
     path('booking', get_booking, name='get_booking'),
@@ -35,6 +37,8 @@ urls = [
     path('orders/delivery/appoint', appoint_courier_to_order, name='appoint_courier_to_order'),
 
     path('orders/active', get_active_orders, name='get_active_orders'),
+    path('orders/export', export_orders, name='export_orders'),
+    path('orders/active/stream', stream_active_orders, name='stream_active_orders'),
 
     path('orders', get_user_orders, name='get_user_orders'),
     path('orders/new', create_order, name='create_order'),
@@ -55,4 +59,9 @@ urls = [
     path('report/employee', get_user_report, name='get_user_report'),
     path('report/employees', get_employees_report, name='get_employees_report'),
     path('report/product', get_product_sales_report, name='get_product_sales_report'),
+    path('report/jobs/new', new_report_job, name='new_report_job'),
+    path('report/jobs/<int:job_id>', get_report_job, name='get_report_job'),
+    path('report/jobs/<int:job_id>/download', download_report_job, name='download_report_job'),
+
+    path('stats/conditional', get_conditional_stats, name='get_conditional_stats'),
 ]
@@ -1,39 +1,69 @@
-import dataclasses
+import hashlib
 import json
-from datetime import datetime, date, timedelta
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
 from functools import wraps
-from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
 
+from api.auth import principal_cache, token_versions
 from api.models import User
 from django.core.exceptions import PermissionDenied
+from django.utils.functional import SimpleLazyObject
 
 import jwt
-from django.http import HttpResponse
-
-from api.services.employee_service import EmployeeService
-from api.services.order_service import OrderService
-from api.services.product_service import ProductService
-from api.services.promo_service import PromoService
-from api.services.report_service import ReportService
-from api.services.user_service import UserService
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import parse_etags
+from django.utils.http import http_date, parse_http_date_safe
+
+from api.container import services
+from api.invalidation import invalidation
+from api.serialization import to_primitive, json_default
 from cursed import settings
 
-__all__ = ['jwt_secured', 'post', 'get', 'provide_services', 'for_roles', 'jsonify', 'timify']
+__all__ = [
+    'jwt_secured', 'post', 'get', 'conditional', 'conditional_stats', 'provide_services', 'for_roles',
+    'jsonify', 'stream_json', 'streaming', 'timify', 'is_asgi'
+]
+
+
+STREAM_CHUNK_SIZE = 200
+
+
+class ConditionalStats:
+    def __init__(self):
+        self._counters: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self._lock = threading.Lock()
+        self.reset()
+
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        self._counters.clear()
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.pid = os.getpid()
+
+    def record(self, endpoint: str, not_modified: bool):
+        with self._lock:
+            counters = self._counters[endpoint]
+            counters[0] += 1
+            counters[1] += not_modified
+
+    def snapshot(self) -> dict[str, tuple[int, int]]:
+        with self._lock:
+            return {endpoint: (requests, not_modified) for endpoint, (requests, not_modified) in self._counters.items()}
+
+
+conditional_stats = ConditionalStats()
 
 
 class EnhancedJSONEncoder(json.JSONEncoder):
     def default(self, o):
-        if dataclasses.is_dataclass(o):
-            return dataclasses.asdict(o)
-        if isinstance(o, datetime):
-            o = o + timedelta(hours=4)
-            return f'{o.day:02d}.{o.month:02d}.{o.year} {o.hour:02d}:{o.minute:02d}'
-        if isinstance(o, date):
-            return f'{o.day:02d}.{o.month:02d}.{o.year}'
-        if isinstance(o, Decimal):
-            return float(o)
-
-        return super().default(o)
+        return json_default(o)
 
 
 def timify(time):
@@ -54,8 +84,63 @@ def timify(time):
     return real_time
 
 
+def is_asgi(request: HttpRequest) -> bool:
+    return isinstance(request, ASGIRequest)
+
+
 def jsonify(obj):
-    return json.dumps(obj, cls=EnhancedJSONEncoder)
+    return json.dumps(to_primitive(obj), default=json_default)
+
+
+async def iterate_in_thread(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    next_chunk = sync_to_async(next)
+
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def streaming(request: HttpRequest, response: StreamingHttpResponse) -> StreamingHttpResponse:
+    if is_asgi(request) and not response.is_async:
+        response.streaming_content = iterate_in_thread(iter(response.streaming_content))
+
+    return response
+
+
+def stream_json(request: HttpRequest, items: Iterable[Any]) -> StreamingHttpResponse:
+    def chunks():
+        yield '['
+
+        separator = ''
+        batch = []
+
+        for item in items:
+            batch.append(jsonify(item))
+
+            if len(batch) == STREAM_CHUNK_SIZE:
+                yield separator + ', '.join(batch)
+                separator = ', '
+                batch = []
+
+        if batch:
+            yield separator + ', '.join(batch)
+
+        yield ']'
+
+    return streaming(request, StreamingHttpResponse(chunks(), content_type='application/json'))
+
+
+def load_principal(user_id: int, token: str) -> User:
+    user = principal_cache.get(user_id, token)
+
+    if user is None:
+        try:
+            user = User.objects.select_related('role').get(id=user_id)
+        except User.DoesNotExist:
+            raise PermissionDenied('Invalid token')
+
+        principal_cache.put(user_id, token, user)
+
+    return user
 
 
 def jwt_secured(endpoint):
@@ -68,35 +153,36 @@ def jwt_secured(endpoint):
 
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-            user_id = payload.get('id')
+        except jwt.ExpiredSignatureError:
+            raise PermissionDenied('Token has expired')
 
-            user = User.objects.get(id=user_id)
+        user_id = payload.get('id')
 
-            if user is None:
-                raise PermissionDenied('Invalid token')
+        if settings.JWT_CLAIMS_AUTH and 'role' in payload and 'ver' in payload:
+            if token_versions.get(user_id) != payload['ver']:
+                raise PermissionDenied('Token has been revoked')
 
-        except jwt.ExpiredSignatureError:
-            raise PermissionDenied('Token has expired')
+            user = SimpleLazyObject(lambda: load_principal(user_id, token))
+        else:
+            user = load_principal(user_id, token)
 
-        return endpoint(request, *args, **kwargs, user=user, token=token)
+        return endpoint(request, *args, **kwargs, user=user, token=token, claims=payload)
 
     return is_authenticated
 
 
+def request_services(request: HttpRequest, function: Callable) -> dict[str, Any]:
+    scope = request.__dict__.setdefault('_services', {})
+
+    return {name: services.resolve(name, scope) for name in services.dependencies(function)}
+
+
 def provide_services(endpoint):
     @wraps(endpoint)
     def provide(request, *args, **kwargs):
-        return endpoint(
-            request,
-            *args,
-            **kwargs,
-            user_service=UserService(),
-            promo_service=PromoService(),
-            product_service=ProductService(),
-            order_service=OrderService(),
-            employee_service=EmployeeService(),
-            report_service=ReportService()
-        )
+        kwargs.update(request_services(request, endpoint))
+
+        return endpoint(request, *args, **kwargs)
 
     return provide
 
@@ -105,7 +191,14 @@ def for_roles(*roles: str):
     def for_roles_decorator(endpoint):
         @wraps(endpoint)
         def validator(request, *args, **kwargs):
-            if kwargs.get('user').role.name not in roles:
+            claims = kwargs.get('claims') or {}
+
+            if settings.JWT_CLAIMS_AUTH and 'role' in claims and 'ver' in claims:
+                role = claims['role']
+            else:
+                role = kwargs.get('user').role.name
+
+            if role not in roles:
                 raise PermissionDenied('У вас нет таких прав')
 
             return endpoint(request, *args, **kwargs)
@@ -115,6 +208,63 @@ def for_roles(*roles: str):
     return for_roles_decorator
 
 
+def is_not_modified(request: HttpRequest, etag: str, last_modified: datetime | None) -> bool:
+    if_none_match = request.headers.get('If-None-Match')
+
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+
+        return etag in (tag.removeprefix('W/') for tag in parse_etags(if_none_match))
+
+    if last_modified is not None:
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+
+        return since is not None and int(last_modified.timestamp()) <= since
+
+    return False
+
+
+def conditional(*namespaces: str, key: Callable[..., str] | None = None):
+    def conditional_decorator(endpoint):
+        @wraps(endpoint)
+        def validator(request, *args, **kwargs):
+            stamps = [invalidation.stamp(namespace) for namespace in namespaces]
+
+            parts = [endpoint.__name__, *(f'{namespace}:{version}' for namespace, (version, _) in zip(namespaces, stamps))]
+            if key is not None:
+                parts.append(key(request, **request_services(request, key)))
+
+            etag = f'"{hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest()}"'
+            last_modified = None if key is not None else max(
+                (updated_at for _, updated_at in stamps if updated_at is not None),
+                default=None
+            )
+
+            not_modified = is_not_modified(request, etag, last_modified)
+            conditional_stats.record(endpoint.__name__, not_modified)
+
+            if not_modified:
+                response = HttpResponseNotModified()
+            else:
+                response = endpoint(request, *args, **kwargs)
+
+                if response.status_code != 200:
+                    return response
+
+            response.headers['ETag'] = etag
+            if last_modified is not None:
+                response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.headers['Access-Control-Expose-Headers'] = 'ETag, Last-Modified'
+
+            return response
+
+        return validator
+
+    return conditional_decorator
+
+
 def post(endpoint):
     @wraps(endpoint)
     def is_post(request, *args, **kwargs):
@@ -150,7 +300,7 @@ def get(endpoint):
                 headers={
                     "Access-Control-Allow-Origin": request.headers['origin'],
                     "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
-                    "Access-Control-Allow-Headers": "Authorization, Content-Type",
+                    "Access-Control-Allow-Headers": "Authorization, Content-Type, If-None-Match, If-Modified-Since",
                     "Access-Control-Max-Age": 86400,
                     "Vary": "Accept-Encoding, Origin"
                 }
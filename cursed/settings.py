@@ -15,7 +15,29 @@ from pathlib import Path
 
 env = environ.Env(
     SECRET_KEY=(str, 'django-insecure-bk312jn+_p-9*thb#(i_0c$_-h3f-0gro9g)7_e!7%&eo80)mu'),
-    ALLOWED_HOSTS=(list, ['*', '0.0.0.0', '158.160.115.91'])
+    ALLOWED_HOSTS=(list, ['*', '0.0.0.0', '158.160.115.91']),
+    PRINCIPAL_CACHE_TTL=(int, 300),
+    PRINCIPAL_CACHE_SIZE=(int, 10000),
+    JWT_CLAIMS_AUTH=(bool, False),
+    TOKEN_VERSION_CACHE_TTL=(int, 60),
+    STOCK_LEDGER=(bool, False),
+    AVAILABILITY_CACHE_TTL=(int, 30),
+    AVAILABILITY_CACHE_DAYS=(int, 400),
+    REPORT_WORKERS=(int, 2),
+    REPORT_JOB_TIMEOUT=(int, 600),
+    REPORT_QUEUE_TIMEOUT=(int, 3600),
+    REPORT_TTL=(int, 86400),
+    REPORT_CACHE_MAX_BYTES=(int, 256 * 1024 * 1024),
+    REPORT_CACHE_MAX_AGE=(int, 30 * 86400),
+    REPORT_SPOOL_SIZE=(int, 4 * 1024 * 1024),
+    REPORT_RENDER_PROCESSES=(int, 0),
+    REPORTS_WARMUP=(bool, False),
+    STARTUP_BUDGET_MS=(int, 1000),
+    INVALIDATION_INTERVAL=(float, 1.0),
+    MENU_VECTORIZE=(bool, True),
+    MENU_STOCK_TTL=(float, 5.0),
+    MENU_SNAPSHOT_DELAY=(float, 0.5),
+    MENU_SNAPSHOT_KEEP=(int, 5),
 )
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,6 +76,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.invalidation_middleware',
 ]
 
 ROOT_URLCONF = 'cursed.urls'
@@ -142,6 +165,84 @@ AUTH_USER_MODEL = 'api.User'
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# Authenticated principals (user + role) are cached per worker process
+
+PRINCIPAL_CACHE_TTL = env('PRINCIPAL_CACHE_TTL')
+PRINCIPAL_CACHE_SIZE = env('PRINCIPAL_CACHE_SIZE')
+
+# Authorize by the signed role claim in the token instead of loading the user
+
+JWT_CLAIMS_AUTH = env('JWT_CLAIMS_AUTH')
+TOKEN_VERSION_CACHE_TTL = env('TOKEN_VERSION_CACHE_TTL')
+
+# Record stock changes as StockMovement rows instead of rewriting Ingredient.count;
+# run `manage.py compact_stock_ledger` periodically to fold them into the snapshot.
+# Orders still lock the rows of the ingredients they use to check the balance, so
+# orders sharing an ingredient are serialized in both modes; the ledger only takes
+# the lock at the end of the order transaction and keeps the stock history
+
+STOCK_LEDGER = env('STOCK_LEDGER')
+
+# Per-day bitmaps of booked tables kept by every worker process
+
+AVAILABILITY_CACHE_TTL = env('AVAILABILITY_CACHE_TTL')
+AVAILABILITY_CACHE_DAYS = env('AVAILABILITY_CACHE_DAYS')
+
+# Background PDF reports: worker threads per process, seconds before a stuck job
+# is retried, seconds a queued job may wait for a worker (the queue lives in the
+# process that accepted the job and is lost with it) and seconds a finished
+# report is kept under MEDIA_ROOT/reports
+
+REPORT_WORKERS = env('REPORT_WORKERS')
+REPORT_JOB_TIMEOUT = env('REPORT_JOB_TIMEOUT')
+REPORT_QUEUE_TIMEOUT = env('REPORT_QUEUE_TIMEOUT')
+REPORT_TTL = env('REPORT_TTL')
+
+# Rendered PDF reports under MEDIA_ROOT/report_cache: total size in bytes and
+# seconds since last access before a file is evicted
+
+REPORT_CACHE_MAX_BYTES = env('REPORT_CACHE_MAX_BYTES')
+REPORT_CACHE_MAX_AGE = env('REPORT_CACHE_MAX_AGE')
+
+# Bytes of a rendered PDF kept in memory before it is spooled to a temporary file
+
+REPORT_SPOOL_SIZE = env('REPORT_SPOOL_SIZE')
+
+# Worker processes rendering employee report sections in parallel; 0 or 1 renders
+# in the request process. Parallel rendering needs pypdf to merge the sections
+
+REPORT_RENDER_PROCESSES = env('REPORT_RENDER_PROCESSES')
+
+# reportlab and the report fonts are loaded on first use. Workers that serve
+# reports can load them on startup instead (or call api.pdf.warm_up from a
+# gunicorn post_fork hook). manage.py measure_startup checks the import budget
+
+REPORTS_WARMUP = env('REPORTS_WARMUP')
+STARTUP_BUDGET_MS = env('STARTUP_BUDGET_MS')
+
+# Seconds between checks of the shared cache versions; in-process caches of
+# other workers are dropped at most this long after a change is committed
+
+INVALIDATION_INTERVAL = env('INVALIDATION_INTERVAL')
+
+# Servings of the cookable menu are computed with numpy; with this off the same
+# calculation runs in pure Python
+
+MENU_VECTORIZE = env('MENU_VECTORIZE')
+
+# Orders do not bump the shared stock version, so servings of the cookable menu
+# (and the published menu feed) are rechecked once they are this many seconds
+# old; stock is reloaded only if the stock stamp has moved since
+
+MENU_STOCK_TTL = env('MENU_STOCK_TTL')
+
+# The menu and promos feeds are published to MEDIA_ROOT/menu this many seconds
+# after products, stock or promos change (manage.py publish_menu does it on
+# demand); the last MENU_SNAPSHOT_KEEP versions of each feed are kept
+
+MENU_SNAPSHOT_DELAY = env('MENU_SNAPSHOT_DELAY')
+MENU_SNAPSHOT_KEEP = env('MENU_SNAPSHOT_KEEP')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 